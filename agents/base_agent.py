@@ -1,23 +1,24 @@
 from abc import ABC, abstractmethod
-from langchain.chat_models import ChatOpenAI
-from langchain.memory import ConversationBufferMemory
+from langchain.memory import ConversationSummaryBufferMemory
 from langchain.schema import SystemMessage
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable
 from loguru import logger
-import os
+import asyncio
 from dotenv import load_dotenv
 
+from .llm_pool import get_llm
+
 load_dotenv()
 
 class BaseAgent(ABC):
     def __init__(self, model_name: str = "gpt-4", temperature: float = 0.7):
-        self.llm = ChatOpenAI(
-            temperature=temperature,
-            model_name=model_name,
-            api_key=os.getenv("OPENAI_API_KEY")
-        )
+        # 相同模型與溫度的Agent共用同一個LLM客戶端
+        self.llm = get_llm(model_name, temperature)
         
-        self.memory = ConversationBufferMemory(
+        # 對話超過 token 上限時，較早的內容以低成本模型摘要，避免歷史無限增長
+        self.memory = ConversationSummaryBufferMemory(
+            llm=get_llm("gpt-3.5-turbo", 0.0),
+            max_token_limit=2000,
             memory_key="chat_history",
             return_messages=True
         )
@@ -40,6 +41,25 @@ class BaseAgent(ABC):
         task_description = f"Analyze context: {str(context)}"
         return await self.process_task(task_description)
     
+    async def process_batch(self,
+                            tasks: List[str],
+                            on_progress: Optional[Callable[[int, Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+        """並行處理多個獨立任務，結果順序與輸入相同；單一任務失敗不影響其他任務"""
+        
+        async def run(index: int, task: str) -> Dict[str, Any]:
+            try:
+                result = await self.process_task(task)
+            except Exception as e:
+                self._log_error(e, f"批次任務 {index} 處理失敗")
+                result = self._format_response(f"處理失敗: {str(e)}", metadata={"error": True})
+            
+            if on_progress:
+                on_progress(index, result)
+            return result
+        
+        # 實際的LLM並行數由 llm_pool 的共用上限控制
+        return list(await asyncio.gather(*(run(i, task) for i, task in enumerate(tasks))))
+    
     def _format_response(self, 
                         content: str, 
                         sources: Optional[List[str]] = None, 
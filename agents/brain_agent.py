@@ -343,15 +343,8 @@ class PersonalizedLearningPathway:
 class BrainAgent(BaseAgent):
     """Brain Agent - 學習與認知分析師"""
     
-    def __init__(self):
-        super().__init__(temperature=0.4)  # 較低溫度以確保一致性
-        self.cognitive_tracker = CognitiveLoadTracker()
-        self.neuroplasticity_engine = NeuroplasticityPredictor()
-        self.learning_optimizer = PersonalizedLearningPathway()
-        self.logger = logging.getLogger(__name__)
-    
-    def _get_system_message(self) -> SystemMessage:
-        return SystemMessage(content="""你是一位基於神經科學原理的學習與認知分析師。你的專業職責包括：
+    # 系統提示不依賴實例狀態，所有實例共用同一物件
+    _SYSTEM_MESSAGE = SystemMessage(content="""你是一位基於神經科學原理的學習與認知分析師。你的專業職責包括：
 
 1. 認知能力評估：分析個人學習模式、認知負荷承受能力和注意力特徵
 2. 神經可塑性評估：基於年齡、經驗、動機等因素預測學習潛力
@@ -368,6 +361,16 @@ class BrainAgent(BaseAgent):
 
 請提供具體、可操作的建議，並說明科學依據。""")
     
+    def __init__(self):
+        super().__init__(temperature=0.4)  # 較低溫度以確保一致性
+        self.cognitive_tracker = CognitiveLoadTracker()
+        self.neuroplasticity_engine = NeuroplasticityPredictor()
+        self.learning_optimizer = PersonalizedLearningPathway()
+        self.logger = logging.getLogger(__name__)
+    
+    def _get_system_message(self) -> SystemMessage:
+        return self._SYSTEM_MESSAGE
+    
     async def analyze_context(self, context) -> Dict[str, Any]:
         """分析學習和認知上下文"""
         try:
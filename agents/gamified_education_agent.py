@@ -3,17 +3,33 @@
 結合RAG知識檢索與遊戲化教學元素，提供互動式學習體驗
 """
 
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Optional, Set, Tuple, Callable, AsyncIterator
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
 import json
+import math
 import random
+import re
 import asyncio
+import bisect
+import difflib
+import itertools
+import time
+import unicodedata
+import uuid
+from collections import OrderedDict, defaultdict
 from pathlib import Path
 
-from .base import BaseAgent
-from .rag_agent import RAGKnowledgeAgent
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from .base_agent import BaseAgent
+from .rag_knowledge_agent import RAGKnowledgeAgent
+from .llm_pool import invoke_llm, llm_slot
+from database.progress_store import SQLiteProgressStore
 
 
 class DifficultyLevel(Enum):
@@ -33,6 +49,214 @@ class QuestionType(Enum):
     SCENARIO = "情境題"
 
 
+# LLM 常以 ```json 區塊或前後說明文字包住JSON
+_JSON_FENCE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.DOTALL)
+_JSON_START = re.compile(r"[\[{]")
+
+
+def _loads_json(content: str) -> Any:
+    """解析JSON字串，安裝orjson時使用其較快的解析器"""
+    if orjson is not None:
+        # orjson.JSONDecodeError 繼承自 json.JSONDecodeError，呼叫端的例外處理不需調整
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def _extract_json_block(content: str) -> Optional[str]:
+    """擷取文字中第一個括號平衡的JSON物件或陣列，找不到時返回None"""
+    fenced = _JSON_FENCE.search(content)
+    if fenced:
+        content = fenced.group(1)
+    
+    start = _JSON_START.search(content)
+    if start is None:
+        return None
+    
+    depth = 0
+    in_string = False
+    escaped = False
+    
+    for i in range(start.start(), len(content)):
+        char = content[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            if depth == 0:
+                return content[start.start():i + 1]
+    
+    return None
+
+
+class _JSONObjectStream:
+    """逐段接收串流中的LLM輸出，每當一個頂層JSON物件完整閉合時即解析並返回"""
+    
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._current: List[str] = []
+    
+    def feed(self, text: str) -> List[Any]:
+        """輸入新的文字片段，返回其中新完成的物件（無法解析的物件以None表示）"""
+        completed = []
+        
+        for char in text:
+            if self._depth == 0:
+                # 物件外的陣列括號、程式碼區塊標記或說明文字一律略過
+                if char == "{":
+                    self._depth = 1
+                    self._current = [char]
+                continue
+            
+            self._current.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        completed.append(_loads_json("".join(self._current)))
+                    except json.JSONDecodeError:
+                        completed.append(None)
+        
+        return completed
+
+
+def _parse_llm_json(content: str) -> Any:
+    """解析LLM回傳的JSON，直接解析失敗時再從輸出中擷取JSON區塊重試"""
+    try:
+        return _loads_json(content)
+    except json.JSONDecodeError:
+        block = _extract_json_block(content)
+        if block is None:
+            raise
+        return _loads_json(block)
+
+
+# 問題物件的必要欄位與型別，於載入時固定，驗證時只做 isinstance 檢查
+_QUESTION_REQUIRED_FIELDS: Tuple[Tuple[str, type], ...] = (
+    ("question", str),
+    ("correct_answer", str),
+    ("explanation", str)
+)
+
+
+def _is_valid_question_payload(data: Any) -> bool:
+    """檢查LLM輸出的問題物件是否具備必要欄位，且選項為字串列表"""
+    if not isinstance(data, dict):
+        return False
+    
+    for key, expected_type in _QUESTION_REQUIRED_FIELDS:
+        if not isinstance(data.get(key), expected_type):
+            return False
+    
+    options = data.get("options") or []
+    return isinstance(options, list) and all(isinstance(option, str) for option in options)
+
+
+# 填空題比對前移除的標點（NFKC正規化後全形標點多已轉為半形）
+_ANSWER_PUNCTUATION = str.maketrans("", "", "。、「」『』《》!?;:'\"()[]")
+# 小數點與千分位符號夾在數字之間時保留，否則 "1.5" 與 "15" 會被視為相同
+_ANSWER_SEPARATORS = re.compile(r"(?<!\d)[.,]|[.,](?!\d)")
+# 千分位符號統一移除，"30,000" 與 "30000" 視為相同數值
+_THOUSANDS_SEPARATOR = re.compile(r"(?<=\d),(?=\d{3}(?!\d))")
+_FILL_BLANK_MATCH_RATIO = 0.85
+# 答案中的數值（含小數點），模糊比對時數值必須完全相同
+_ANSWER_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def _normalize_answer(answer: str) -> str:
+    """正規化簡短答案：統一全半形、移除標點與前後空白並轉小寫"""
+    normalized = unicodedata.normalize("NFKC", answer).translate(_ANSWER_PUNCTUATION)
+    normalized = _ANSWER_SEPARATORS.sub("", normalized)
+    return _THOUSANDS_SEPARATOR.sub("", normalized).strip().lower()
+
+
+# 各難度可選的題型與累積權重，供 _select_question_type 以單次亂數抽選
+_QUESTION_TYPE_TABLE: Dict[DifficultyLevel, Tuple[Tuple[QuestionType, ...], Tuple[float, ...]]] = {
+    DifficultyLevel.BEGINNER: (
+        (QuestionType.MULTIPLE_CHOICE, QuestionType.TRUE_FALSE),
+        (0.7, 1.0)
+    ),
+    DifficultyLevel.INTERMEDIATE: (
+        (QuestionType.MULTIPLE_CHOICE, QuestionType.FILL_BLANK, QuestionType.SHORT_ANSWER),
+        (0.5, 0.8, 1.0)
+    ),
+    DifficultyLevel.ADVANCED: (
+        (QuestionType.SCENARIO, QuestionType.SHORT_ANSWER, QuestionType.MULTIPLE_CHOICE),
+        (0.4, 0.8, 1.0)
+    ),
+    DifficultyLevel.EXPERT: (
+        (QuestionType.SCENARIO, QuestionType.SHORT_ANSWER),
+        (0.6, 1.0)
+    )
+}
+
+# 各難度與題型組合的經驗獎勵，於載入時一次算好
+_EXP_BASE_REWARD = {
+    DifficultyLevel.BEGINNER: 10,
+    DifficultyLevel.INTERMEDIATE: 20,
+    DifficultyLevel.ADVANCED: 35,
+    DifficultyLevel.EXPERT: 50
+}
+
+_EXP_TYPE_MULTIPLIER = {
+    QuestionType.TRUE_FALSE: 1.0,
+    QuestionType.MULTIPLE_CHOICE: 1.2,
+    QuestionType.FILL_BLANK: 1.3,
+    QuestionType.SHORT_ANSWER: 1.5,
+    QuestionType.SCENARIO: 1.8
+}
+
+_EXP_REWARD: Dict[Tuple[DifficultyLevel, QuestionType], int] = {
+    (difficulty, question_type): int(_EXP_BASE_REWARD[difficulty] * _EXP_TYPE_MULTIPLIER[question_type])
+    for difficulty in DifficultyLevel
+    for question_type in QuestionType
+}
+
+# 答題反饋的開場鼓勵語
+_ENCOURAGE_CORRECT = (
+    "太棒了！你答對了！🎉",
+    "正確！你的理解很準確！👏",
+    "很好！繼續保持！⭐",
+    "答案完全正確！你真厲害！💪"
+)
+
+_ENCOURAGE_WRONG = (
+    "沒關係，我們一起來學習！💪",
+    "不要氣餒，錯誤是學習的一部分！🌱",
+    "很接近了！讓我們再深入了解一下！📚",
+    "好的嘗試！讓我們一起探索正確答案！🔍"
+)
+
+# 激勵訊息模板，只格式化抽中的那一則
+_MOTIVATIONAL_TEMPLATES = (
+    "你已經回答了{progress.questions_answered}個問題，繼續加油！",
+    "你的學習等級是{progress.current_level}級，真了不起！",
+    "連續學習{progress.current_streak}天，堅持就是勝利！",
+    "正確率{progress.accuracy:.1%}，你的進步很明顯！"
+)
+
+
 class AchievementType(Enum):
     """成就類型"""
     LEARNING_STREAK = "連續學習"
@@ -50,11 +274,17 @@ class LearningProgress:
     current_level: int = 1
     current_streak: int = 0
     best_streak: int = 0
-    topics_mastered: List[str] = field(default_factory=list)
+    topics_mastered: Set[str] = field(default_factory=set)
     questions_answered: int = 0
     correct_answers: int = 0
     last_activity: datetime = field(default_factory=datetime.now)
-    achievements: List[str] = field(default_factory=list)
+    achievements: Dict[str, datetime] = field(default_factory=dict)  # 成就ID -> 解鎖時間，依解鎖順序排列
+    
+    @property
+    def accuracy(self) -> float:
+        """答題正確率，尚未答題時為0"""
+        answered = self.questions_answered
+        return self.correct_answers / answered if answered else 0.0
 
 
 @dataclass
@@ -99,6 +329,13 @@ class LearningSession:
     start_time: datetime = field(default_factory=datetime.now)
     end_time: Optional[datetime] = None
     is_completed: bool = False
+    # 預計題數；首題之後的問題可能仍在背景生成
+    total_questions: int = 0
+    pending_questions: Optional[asyncio.Task] = field(default=None, repr=False, compare=False)
+    
+    def __post_init__(self):
+        if not self.total_questions:
+            self.total_questions = len(self.questions)
 
 
 class GamifiedEducationAgent(BaseAgent):
@@ -117,13 +354,44 @@ class GamifiedEducationAgent(BaseAgent):
     def __init__(self, 
                  rag_agent: RAGKnowledgeAgent,
                  model_name: str = "gpt-4",
-                 temperature: float = 0.7):
+                 temperature: float = 0.7,
+                 progress_store: Optional[SQLiteProgressStore] = None):
         super().__init__(model_name, temperature)
         
         self.rag_agent = rag_agent
-        self.user_progress: Dict[str, LearningProgress] = {}
+        
+        # 有持久化存儲時，user_progress 僅作為最近使用用戶的快取
+        self.progress_store = progress_store
+        self.user_progress: "OrderedDict[str, LearningProgress]" = OrderedDict()
+        self._progress_cache_size = 10_000
         self.achievements: List[Achievement] = []
-        self.active_sessions: Dict[str, LearningSession] = {}
+        self._achievement_rules: List[Tuple[Achievement, Callable[[LearningProgress, float, bool], bool]]] = []
+        # 會話依建立順序保存，建立新會話時清除逾時或超量的舊會話
+        self.active_sessions: "OrderedDict[str, LearningSession]" = OrderedDict()
+        self._session_ttl = timedelta(hours=24)
+        self._max_sessions = 10_000
+        self._session_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._id_counter = itertools.count()
+        
+        # 主題知識快取：query -> (寫入時間, RAG結果)，依最近使用順序淘汰
+        self._rag_cache: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._rag_cache_ttl = 3600
+        self._rag_cache_max_size = 512
+        
+        # 預先生成的問題池：(主題, 難度) -> 問題佇列，依最近使用順序淘汰，由背景任務補充
+        self._question_pool: "OrderedDict[Tuple[str, DifficultyLevel], asyncio.Queue]" = OrderedDict()
+        self._pool_fillers: Dict[Tuple[str, DifficultyLevel], asyncio.Task] = {}
+        self._pool_max_keys = 64
+        self._pool_low_watermark = 4
+        self._pool_batch_size = 8
+        
+        # 任務指令 -> 處理函式，處理函式接收已拆分的參數列表
+        self._task_router: Dict[str, Callable[[List[str]], Any]] = {
+            "start_session": self._handle_start_session,
+            "answer_question": self._handle_answer_question,
+            "get_progress": self._handle_get_progress,
+            "generate_question": self._handle_generate_question
+        }
         
         # 初始化成就系統
         self._initialize_achievements()
@@ -207,6 +475,9 @@ class GamifiedEducationAgent(BaseAgent):
                 reward_exp=achievement_data["reward_exp"]
             )
             self.achievements.append(achievement)
+            self._achievement_rules.append(
+                (achievement, self._compile_achievement_condition(achievement.condition))
+            )
     
     def _load_question_templates(self) -> Dict[QuestionType, List[str]]:
         """載入問題模板"""
@@ -233,17 +504,13 @@ class GamifiedEducationAgent(BaseAgent):
     
     async def process_task(self, task: str) -> Dict[str, Any]:
         """處理學習任務"""
-        # 解析任務類型
-        if task.startswith("start_session"):
-            return await self._handle_start_session(task)
-        elif task.startswith("answer_question"):
-            return await self._handle_answer_question(task)
-        elif task.startswith("get_progress"):
-            return await self._handle_get_progress(task)
-        elif task.startswith("generate_question"):
-            return await self._handle_generate_question(task)
-        else:
+        # 任務格式為「指令|參數1|參數2...」，指令不在路由表中時視為一般查詢
+        command, _, arguments = task.partition("|")
+        handler = self._task_router.get(command)
+        if handler is None:
             return await self._handle_general_inquiry(task)
+        
+        return await handler(arguments.split("|") if arguments else [])
     
     async def start_learning_session(self, 
                                    user_id: str, 
@@ -252,16 +519,16 @@ class GamifiedEducationAgent(BaseAgent):
                                    question_count: int = 5) -> LearningSession:
         """開始學習會話"""
         
-        session_id = f"{user_id}_{datetime.now().timestamp()}"
+        session_id = f"{user_id}_{uuid.uuid4().hex}"
         
         # 獲取用戶進度
-        progress = self.get_user_progress(user_id)
+        progress = await self.get_user_progress(user_id)
         
         # 根據進度調整難度
         adjusted_difficulty = self._adjust_difficulty(progress, topic, difficulty)
         
-        # 生成問題
-        questions = await self._generate_questions(topic, adjusted_difficulty, question_count)
+        # 只等待第一題即返回（優先使用預先生成的問題池），其餘問題在背景生成
+        questions = await self._take_pooled_questions(topic, adjusted_difficulty, 1)
         
         # 創建學習會話
         session = LearningSession(
@@ -269,58 +536,274 @@ class GamifiedEducationAgent(BaseAgent):
             user_id=user_id,
             topic=topic,
             difficulty=adjusted_difficulty,
-            questions=questions
+            questions=questions,
+            total_questions=question_count
         )
         
+        if question_count > 1:
+            session.pending_questions = asyncio.create_task(
+                self._generate_remaining_questions(topic, adjusted_difficulty, question_count - 1)
+            )
+        
+        self._prune_sessions()
         self.active_sessions[session_id] = session
         
         return session
     
+    def _prune_sessions(self):
+        """移除超過保存期限的會話，並限制會話總數"""
+        cutoff = datetime.now() - self._session_ttl
+        
+        while self.active_sessions:
+            oldest = next(iter(self.active_sessions.values()))
+            if oldest.start_time >= cutoff and len(self.active_sessions) < self._max_sessions:
+                break
+            session_id, session = self.active_sessions.popitem(last=False)
+            self._session_locks.pop(session_id, None)
+            if session.pending_questions is not None:
+                session.pending_questions.cancel()
+    
+    async def _generate_remaining_questions(self,
+                                            topic: str,
+                                            difficulty: DifficultyLevel,
+                                            count: int) -> List[LearningQuestion]:
+        """背景生成會話首題之後的問題，失敗時以備用問題補足題數"""
+        try:
+            return await self._take_pooled_questions(topic, difficulty, count)
+        except Exception as e:
+            self._log_error(e, f"生成會話剩餘問題失敗 ({topic}, {difficulty.value})")
+            return [
+                self._create_fallback_question(topic, difficulty, self._select_question_type(difficulty, i))
+                for i in range(count)
+            ]
+    
+    async def _collect_pending_questions(self, session: LearningSession):
+        """等待背景生成的剩餘問題並併入會話"""
+        pending = session.pending_questions
+        if pending is None:
+            return
+        
+        session.pending_questions = None
+        session.questions.extend(await pending)
+    
     async def _generate_questions(self, 
                                 topic: str, 
                                 difficulty: DifficultyLevel, 
                                 count: int) -> List[LearningQuestion]:
         """生成學習問題"""
-        
-        questions = []
+        return [question async for question in self.stream_questions(topic, difficulty, count)]
+    
+    async def stream_questions(self,
+                               topic: str,
+                               difficulty: DifficultyLevel,
+                               count: int) -> AsyncIterator[LearningQuestion]:
+        """逐題生成學習問題，每題在LLM輸出中完整閉合後立即產出"""
         
         # 從RAG系統獲取相關知識
         knowledge_query = f"請提供關於{topic}的詳細資訊，包括定義、重要概念、實際應用和常見問題"
-        rag_result = await self.rag_agent.query(knowledge_query)
+        rag_result = await self._query_topic_knowledge(knowledge_query)
         
         context = rag_result.answer
         source_docs = rag_result.source_documents
         
-        for i in range(count):
-            question_type = self._select_question_type(difficulty, i)
-            question = await self._create_question(
+        # 預先決定每題的題型，再以單次LLM呼叫批次生成
+        question_types = [self._select_question_type(difficulty, i) for i in range(count)]
+        
+        if not question_types:
+            return
+        
+        if count == 1:
+            yield await self._create_question(
                 topic=topic,
                 context=context,
-                question_type=question_type,
+                question_type=question_types[0],
                 difficulty=difficulty,
                 sources=source_docs
             )
-            questions.append(question)
+            return
+        
+        type_lines = "\n".join(
+            f"{i + 1}. {question_type.value}" for i, question_type in enumerate(question_types)
+        )
+        
+        prompt = f"""
+        基於以下資訊，創建{count}個{difficulty.value}難度的不同問題，題型依序為：
+        {type_lines}
+        
+        主題：{topic}
+        相關知識：{context[:1000]}
+        
+        請以JSON陣列格式回答，陣列中每個元素的格式如下：
+        {{
+            "question": "問題內容",
+            "options": ["選項1", "選項2", "選項3", "選項4"] (僅選擇題需要),
+            "correct_answer": "正確答案",
+            "explanation": "詳細解釋為什麼這是正確答案",
+            "key_concepts": ["關鍵概念1", "關鍵概念2"]
+        }}
+        """
+        
+        parser = _JSONObjectStream()
+        parsed: asyncio.Queue = asyncio.Queue()
+        
+        async def produce():
+            # 只在讀取LLM輸出期間佔用共用額度，不等待下游消費者，避免緩慢的客戶端佔住名額；
+            # 串流輸出已部分產出後無法重試，僅受共用的速率與並行上限管控
+            produced = 0
+            try:
+                async with llm_slot():
+                    async for chunk in self.llm.astream([self.system_message, {"role": "user", "content": prompt}]):
+                        for question_data in parser.feed(chunk.content):
+                            parsed.put_nowait(question_data)
+                            produced += 1
+                            if produced == count:
+                                return
+            finally:
+                parsed.put_nowait(None)
+        
+        producer = asyncio.create_task(produce())
+        generated = 0
+        try:
+            while generated < count:
+                question_data = await parsed.get()
+                if question_data is None:
+                    break
+                
+                question_type = question_types[generated]
+                question = self._build_question(question_data, topic, context, question_type, difficulty)
+                
+                # 單題格式錯誤時只替換該題，不影響整批結果
+                yield question or self._create_fallback_question(topic, difficulty, question_type)
+                
+                generated += 1
+            
+            if generated == count:
+                return
+            # LLM呼叫失敗時拋出原本的例外
+            await producer
+        finally:
+            if not producer.cancel() and not producer.cancelled():
+                # 已結束的生產任務取出其例外，避免消費端提前關閉時記錄未取出的例外
+                producer.exception()
+        
+        # 模型輸出的完整題目不足時，以備用問題補齊
+        self._log_error(ValueError(f"僅解析出{generated}/{count}題"), "批次問題JSON解析不完整")
+        for question_type in question_types[generated:]:
+            yield self._create_fallback_question(topic, difficulty, question_type)
+    
+    async def _take_pooled_questions(self,
+                                     topic: str,
+                                     difficulty: DifficultyLevel,
+                                     count: int) -> List[LearningQuestion]:
+        """從問題池取出問題，不足部分即時生成；完全由問題池供應時才排程背景補充"""
+        key = (topic, difficulty)
+        queue = self._question_pool.get(key)
+        questions = []
+        
+        if queue is None:
+            # 首次請求的主題只即時生成所需題數，避免任意主題都觸發整批預先生成
+            self._add_pool(key)
+            return await self._generate_questions(topic, difficulty, count)
+        
+        self._question_pool.move_to_end(key)
+        while len(questions) < count and not queue.empty():
+            questions.append(queue.get_nowait())
+        
+        if len(questions) < count:
+            # 本次已需即時生成，改由同一次LLM輸出多生成的問題補充問題池，不再另排背景批次
+            questions.extend(await self._generate_and_seed(key, count - len(questions)))
+        else:
+            self._schedule_pool_refill(key)
         
         return questions
     
+    def _add_pool(self, key: Tuple[str, DifficultyLevel]):
+        """建立問題池，超過上限時移除最久未使用的問題池並取消其補充任務"""
+        self._question_pool[key] = asyncio.Queue(maxsize=32)
+        
+        while len(self._question_pool) > self._pool_max_keys:
+            evicted, _ = self._question_pool.popitem(last=False)
+            filler = self._pool_fillers.pop(evicted, None)
+            if filler is not None:
+                filler.cancel()
+    
+    async def _generate_and_seed(self,
+                                 key: Tuple[str, DifficultyLevel],
+                                 count: int) -> List[LearningQuestion]:
+        """即時生成所需題數，同一批輸出中其餘問題由背景任務放入問題池"""
+        topic, difficulty = key
+        filler = self._pool_fillers.get(key)
+        if filler is not None and not filler.done():
+            return await self._generate_questions(topic, difficulty, count)
+        
+        stream = self.stream_questions(topic, difficulty, count + self._pool_batch_size)
+        try:
+            questions = [await stream.__anext__() for _ in range(count)]
+        except BaseException:
+            await stream.aclose()
+            raise
+        
+        self._pool_fillers[key] = asyncio.create_task(self._fill_pool(key, stream))
+        return questions
+    
+    def _schedule_pool_refill(self, key: Tuple[str, DifficultyLevel]):
+        """問題池低於水位時排程背景補充任務"""
+        if self._question_pool[key].qsize() >= self._pool_low_watermark:
+            return
+        
+        filler = self._pool_fillers.get(key)
+        if filler is not None and not filler.done():
+            return
+        
+        topic, difficulty = key
+        self._pool_fillers[key] = asyncio.create_task(
+            self._fill_pool(key, self.stream_questions(topic, difficulty, self._pool_batch_size))
+        )
+    
+    async def _fill_pool(self,
+                         key: Tuple[str, DifficultyLevel],
+                         stream: AsyncIterator[LearningQuestion]):
+        """背景消耗問題串流並放入問題池，完成後移除補充任務記錄"""
+        try:
+            async for question in stream:
+                queue = self._question_pool.get(key)
+                if queue is None or queue.full():
+                    break
+                queue.put_nowait(question)
+        except Exception as e:
+            self._log_error(e, f"預先生成問題失敗 ({key[0]}, {key[1].value})")
+        finally:
+            await stream.aclose()
+            if self._pool_fillers.get(key) is asyncio.current_task():
+                del self._pool_fillers[key]
+    
+    async def _query_topic_knowledge(self, knowledge_query: str) -> Any:
+        """查詢主題知識，在TTL內重複使用相同查詢的RAG結果"""
+        now = time.monotonic()
+        cached = self._rag_cache.get(knowledge_query)
+        
+        if cached is not None and now - cached[0] < self._rag_cache_ttl:
+            self._rag_cache.move_to_end(knowledge_query)
+            return cached[1]
+        
+        rag_result = await self.rag_agent.query(knowledge_query)
+        
+        self._rag_cache[knowledge_query] = (now, rag_result)
+        self._rag_cache.move_to_end(knowledge_query)
+        while len(self._rag_cache) > self._rag_cache_max_size:
+            self._rag_cache.popitem(last=False)
+        
+        return rag_result
+    
+    def clear_knowledge_cache(self) -> None:
+        """清除主題知識快取（知識庫更新後呼叫）"""
+        self._rag_cache.clear()
+    
     def _select_question_type(self, difficulty: DifficultyLevel, question_index: int) -> QuestionType:
         """根據難度選擇問題類型"""
         
-        if difficulty == DifficultyLevel.BEGINNER:
-            types = [QuestionType.MULTIPLE_CHOICE, QuestionType.TRUE_FALSE]
-            weights = [0.7, 0.3]
-        elif difficulty == DifficultyLevel.INTERMEDIATE:
-            types = [QuestionType.MULTIPLE_CHOICE, QuestionType.FILL_BLANK, QuestionType.SHORT_ANSWER]
-            weights = [0.5, 0.3, 0.2]
-        elif difficulty == DifficultyLevel.ADVANCED:
-            types = [QuestionType.SCENARIO, QuestionType.SHORT_ANSWER, QuestionType.MULTIPLE_CHOICE]
-            weights = [0.4, 0.4, 0.2]
-        else:  # EXPERT
-            types = [QuestionType.SCENARIO, QuestionType.SHORT_ANSWER]
-            weights = [0.6, 0.4]
-        
-        return random.choices(types, weights=weights)[0]
+        types, cumulative_weights = _QUESTION_TYPE_TABLE[difficulty]
+        return types[bisect.bisect(cumulative_weights, random.random())]
     
     async def _create_question(self, 
                              topic: str, 
@@ -353,51 +836,52 @@ class GamifiedEducationAgent(BaseAgent):
         """
         
         # 使用LLM生成問題
-        response = await self.llm.ainvoke([self.system_message, {"role": "user", "content": prompt}])
+        response = await invoke_llm(self.llm, [self.system_message, {"role": "user", "content": prompt}])
         
         try:
-            question_data = json.loads(response.content)
-            
-            # 計算經驗獎勵
-            exp_reward = self._calculate_exp_reward(difficulty, question_type)
-            
-            question = LearningQuestion(
-                id=f"{topic}_{datetime.now().timestamp()}",
-                question=question_data["question"],
-                options=question_data.get("options", []),
-                correct_answer=question_data["correct_answer"],
-                explanation=question_data["explanation"],
-                topic=topic,
-                difficulty=difficulty,
-                question_type=question_type,
-                source_context=context[:500],
-                exp_reward=exp_reward
-            )
-            
-            return question
-            
-        except json.JSONDecodeError:
+            question_data = _parse_llm_json(response.content)
+        except json.JSONDecodeError as e:
+            self._log_error(e, "問題JSON解析失敗")
+            question_data = None
+        
+        question = self._build_question(question_data, topic, context, question_type, difficulty)
+        
+        if question is None:
             # 如果JSON解析失敗，創建默認問題
             return self._create_fallback_question(topic, difficulty, question_type)
+        
+        return question
     
-    def _calculate_exp_reward(self, difficulty: DifficultyLevel, question_type: QuestionType) -> int:
-        """計算經驗獎勵"""
-        base_reward = {
-            DifficultyLevel.BEGINNER: 10,
-            DifficultyLevel.INTERMEDIATE: 20,
-            DifficultyLevel.ADVANCED: 35,
-            DifficultyLevel.EXPERT: 50
-        }
+    def _build_question(self,
+                        question_data: Any,
+                        topic: str,
+                        context: str,
+                        question_type: QuestionType,
+                        difficulty: DifficultyLevel) -> Optional[LearningQuestion]:
+        """由LLM輸出的JSON物件建立問題，格式不符時返回None"""
         
-        type_multiplier = {
-            QuestionType.TRUE_FALSE: 1.0,
-            QuestionType.MULTIPLE_CHOICE: 1.2,
-            QuestionType.FILL_BLANK: 1.3,
-            QuestionType.SHORT_ANSWER: 1.5,
-            QuestionType.SCENARIO: 1.8
-        }
+        if not _is_valid_question_payload(question_data):
+            return None
         
-        return int(base_reward[difficulty] * type_multiplier[question_type])
+        # 計算經驗獎勵
+        exp_reward = self._calculate_exp_reward(difficulty, question_type)
+        
+        return LearningQuestion(
+            id=f"{topic}_{next(self._id_counter):x}",
+            question=question_data["question"],
+            options=question_data.get("options") or [],
+            correct_answer=question_data["correct_answer"],
+            explanation=question_data["explanation"],
+            topic=topic,
+            difficulty=difficulty,
+            question_type=question_type,
+            source_context=context[:500],
+            exp_reward=exp_reward
+        )
+    
+    def _calculate_exp_reward(self, difficulty: DifficultyLevel, question_type: QuestionType) -> int:
+        """計算經驗獎勵"""
+        return _EXP_REWARD[(difficulty, question_type)]
     
     def _create_fallback_question(self, 
                                 topic: str, 
@@ -405,7 +889,7 @@ class GamifiedEducationAgent(BaseAgent):
                                 question_type: QuestionType) -> LearningQuestion:
         """創建備用問題"""
         return LearningQuestion(
-            id=f"fallback_{datetime.now().timestamp()}",
+            id=f"fallback_{next(self._id_counter):x}",
             question=f"請簡要說明{topic}的重要性",
             options=[],
             correct_answer="需要詳細解釋",
@@ -426,69 +910,90 @@ class GamifiedEducationAgent(BaseAgent):
         if session_id not in self.active_sessions:
             return {"error": "會話不存在"}
         
-        session = self.active_sessions[session_id]
-        current_question = session.questions[session.current_question_index]
-        
-        # 評估答案
-        is_correct = await self._evaluate_answer(current_question, answer)
-        
-        # 更新會話狀態
-        if is_correct:
-            session.score += current_question.exp_reward
-        
-        # 更新用戶進度
-        progress = self.get_user_progress(session.user_id)
-        progress.questions_answered += 1
-        if is_correct:
-            progress.correct_answers += 1
-            progress.total_experience += current_question.exp_reward
-        
-        # 檢查成就
-        new_achievements = self._check_achievements(session.user_id, response_time, is_correct)
-        
-        # 檢查等級提升
-        level_up = self._check_level_up(progress)
-        
-        # 準備回饋
-        feedback = await self._generate_feedback(current_question, answer, is_correct)
-        
-        # 移動到下一題
-        session.current_question_index += 1
-        
-        # 檢查會話是否完成
-        if session.current_question_index >= len(session.questions):
-            session.is_completed = True
-            session.end_time = datetime.now()
-            # 更新學習連續天數
-            self._update_learning_streak(session.user_id)
-        
-        result = {
-            "is_correct": is_correct,
-            "score": session.score,
-            "feedback": feedback,
-            "explanation": current_question.explanation,
-            "new_achievements": new_achievements,
-            "level_up": level_up,
-            "session_completed": session.is_completed,
-            "progress": {
-                "current_question": session.current_question_index,
-                "total_questions": len(session.questions),
-                "accuracy": progress.correct_answers / progress.questions_answered if progress.questions_answered > 0 else 0
-            }
-        }
-        
-        if not session.is_completed:
-            # 提供下一題
-            next_question = session.questions[session.current_question_index]
-            result["next_question"] = {
-                "id": next_question.id,
-                "question": next_question.question,
-                "options": next_question.options,
-                "type": next_question.question_type.value,
-                "difficulty": next_question.difficulty.value
+        # 同一會話的提交需序列化，避免重試請求重複計分或跳題
+        async with self._session_locks[session_id]:
+            session = self.active_sessions.get(session_id)
+            if session is None:
+                return {"error": "會話不存在"}
+            if session.is_completed:
+                return {"error": "會話已完成"}
+            
+            current_question = session.questions[session.current_question_index]
+            
+            # 評估答案（開放題的評分與學習提示由同一次LLM呼叫產生）
+            is_correct, learning_tip = await self._assess_answer(current_question, answer)
+            
+            # 反饋只依賴答題結果，先行發出以便與後續進度更新重疊
+            feedback_task = asyncio.create_task(
+                self._generate_feedback(current_question, answer, is_correct, learning_tip)
+            )
+            
+            try:
+                # 更新會話狀態
+                if is_correct:
+                    session.score += current_question.exp_reward
+                
+                # 更新用戶進度
+                progress = await self.get_user_progress(session.user_id)
+                progress.questions_answered += 1
+                if is_correct:
+                    progress.correct_answers += 1
+                    progress.total_experience += current_question.exp_reward
+                
+                # 檢查成就
+                new_achievements = self._check_achievements(progress, response_time, is_correct)
+                
+                # 檢查等級提升
+                level_up = self._check_level_up(progress)
+            except BaseException:
+                # 進度更新失敗時取消反饋任務，避免任務遺留且例外未被取出
+                feedback_task.cancel()
+                raise
+            
+            # 準備回饋
+            feedback = await feedback_task
+            
+            # 移動到下一題，下一題尚未生成時等待背景任務
+            session.current_question_index += 1
+            if session.current_question_index >= len(session.questions):
+                await self._collect_pending_questions(session)
+            
+            # 檢查會話是否完成
+            if session.current_question_index >= len(session.questions):
+                session.is_completed = True
+                session.end_time = datetime.now()
+                # 更新學習連續天數
+                self._update_learning_streak(progress)
+            
+            await self._save_user_progress(progress)
+            
+            result = {
+                "is_correct": is_correct,
+                "score": session.score,
+                "feedback": feedback,
+                "explanation": current_question.explanation,
+                "new_achievements": new_achievements,
+                "level_up": level_up,
+                "session_completed": session.is_completed,
+                "progress": {
+                    "current_question": session.current_question_index,
+                    "total_questions": session.total_questions,
+                    "accuracy": progress.accuracy
+                }
             }
-        
-        return result
+            
+            if not session.is_completed:
+                # 提供下一題
+                next_question = session.questions[session.current_question_index]
+                result["next_question"] = {
+                    "id": next_question.id,
+                    "question": next_question.question,
+                    "options": next_question.options,
+                    "type": next_question.question_type.value,
+                    "difficulty": next_question.difficulty.value
+                }
+            
+            return result
     
     async def _evaluate_answer(self, question: LearningQuestion, user_answer: str) -> bool:
         """評估用戶答案"""
@@ -497,47 +1002,81 @@ class GamifiedEducationAgent(BaseAgent):
             # 直接比較答案
             return user_answer.strip().lower() == question.correct_answer.strip().lower()
         
+        elif question.question_type == QuestionType.FILL_BLANK:
+            # 填空答案簡短，以正規化後的相似度判斷，不需呼叫LLM
+            normalized_answer = _normalize_answer(user_answer)
+            expected_answer = _normalize_answer(question.correct_answer)
+            if normalized_answer == expected_answer:
+                return True
+            if _ANSWER_NUMBER.findall(normalized_answer) != _ANSWER_NUMBER.findall(expected_answer):
+                return False
+            return difflib.SequenceMatcher(None, normalized_answer, expected_answer).ratio() >= _FILL_BLANK_MATCH_RATIO
+        
         else:
             # 使用LLM評估開放性答案
-            evaluation_prompt = f"""
-            請評估以下答案是否正確：
-            
-            問題：{question.question}
-            標準答案：{question.correct_answer}
-            用戶答案：{user_answer}
-            
-            請回答 "正確" 或 "不正確"，並簡要說明原因。
-            """
-            
-            response = await self.llm.ainvoke([{"role": "user", "content": evaluation_prompt}])
-            
-            return "正確" in response.content
+            is_correct, _ = await self._evaluate_open_answer(question, user_answer)
+            return is_correct
+    
+    async def _assess_answer(self, question: LearningQuestion, user_answer: str) -> Tuple[bool, Optional[str]]:
+        """評估答案；開放題一併返回LLM產生的學習提示，其他題型提示為None"""
+        if question.question_type in (QuestionType.SHORT_ANSWER, QuestionType.SCENARIO):
+            return await self._evaluate_open_answer(question, user_answer)
+        
+        return await self._evaluate_answer(question, user_answer), None
+    
+    async def _evaluate_open_answer(self, question: LearningQuestion, user_answer: str) -> Tuple[bool, Optional[str]]:
+        """以單次LLM呼叫評分開放題並生成學習提示"""
+        evaluation_prompt = f"""
+        請評估以下答案是否正確，並提供一個學習提示：
+        
+        問題：{question.question}
+        標準答案：{question.correct_answer}
+        用戶答案：{user_answer}
+        
+        請以JSON格式回答：
+        {{
+            "is_correct": true 或 false,
+            "reason": "簡要說明原因",
+            "learning_tip": "答對時提供相關的擴展知識以鞏固理解；答錯時提供鼓勵性且具指導意義的建議，幫助理解正確概念。保持簡潔。"
+        }}
+        """
+        
+        response = await invoke_llm(self.llm, [{"role": "user", "content": evaluation_prompt}])
+        
+        try:
+            result = _parse_llm_json(response.content)
+            if not isinstance(result, dict):
+                raise TypeError(f"預期JSON物件，實際為{type(result).__name__}")
+            is_correct = result["is_correct"]
+            if isinstance(is_correct, str):
+                is_correct = is_correct.strip().lower() in ("true", "正確")
+            learning_tip = result.get("learning_tip")
+            return bool(is_correct), learning_tip.strip() if isinstance(learning_tip, str) else None
+        except (json.JSONDecodeError, AttributeError, KeyError, TypeError) as e:
+            # 格式不符時以文字判斷對錯，學習提示改由 _generate_learning_tip 另行生成
+            self._log_error(e, "開放題評估JSON解析失敗")
+            content = response.content
+            return "正確" in content and "不正確" not in content, None
     
     async def _generate_feedback(self, 
                                question: LearningQuestion, 
                                user_answer: str, 
-                               is_correct: bool) -> str:
+                               is_correct: bool,
+                               learning_tip: Optional[str] = None) -> str:
         """生成個性化反饋"""
         
-        if is_correct:
-            encouragements = [
-                "太棒了！你答對了！🎉",
-                "正確！你的理解很準確！👏",
-                "很好！繼續保持！⭐",
-                "答案完全正確！你真厲害！💪"
-            ]
-            base_feedback = random.choice(encouragements)
-        else:
-            encouragements = [
-                "沒關係，我們一起來學習！💪",
-                "不要氣餒，錯誤是學習的一部分！🌱",
-                "很接近了！讓我們再深入了解一下！📚",
-                "好的嘗試！讓我們一起探索正確答案！🔍"
-            ]
-            base_feedback = random.choice(encouragements)
+        base_feedback = random.choice(_ENCOURAGE_CORRECT if is_correct else _ENCOURAGE_WRONG)
+        
+        # 評估時已取得學習提示則直接使用，不再額外呼叫LLM
+        if learning_tip:
+            return f"{base_feedback}\n\n{learning_tip}"
         
-        # 添加學習建議
-        learning_tip = await self._generate_learning_tip(question, is_correct)
+        # 添加學習建議；提示生成失敗時仍返回基本反饋
+        try:
+            learning_tip = await self._generate_learning_tip(question, is_correct)
+        except Exception as e:
+            self._log_error(e, "生成學習提示失敗")
+            return base_feedback
         
         return f"{base_feedback}\n\n{learning_tip}"
     
@@ -557,19 +1096,18 @@ class GamifiedEducationAgent(BaseAgent):
             要鼓勵性且具有指導意義。
             """
         
-        response = await self.llm.ainvoke([{"role": "user", "content": tip_prompt}])
+        response = await invoke_llm(self.llm, [{"role": "user", "content": tip_prompt}])
         return response.content.strip()
     
-    def _check_achievements(self, user_id: str, response_time: float, is_correct: bool) -> List[Dict[str, Any]]:
+    def _check_achievements(self, progress: LearningProgress, response_time: float, is_correct: bool) -> List[Dict[str, Any]]:
         """檢查並解鎖成就"""
-        progress = self.get_user_progress(user_id)
         new_achievements = []
         
-        for achievement in self.achievements:
+        for achievement, is_unlocked in self._achievement_rules:
             if achievement.id not in progress.achievements:
-                if self._check_achievement_condition(achievement, progress, response_time, is_correct):
+                if is_unlocked(progress, response_time, is_correct):
                     # 解鎖成就
-                    progress.achievements.append(achievement.id)
+                    progress.achievements[achievement.id] = datetime.now()
                     progress.total_experience += achievement.reward_exp
                     
                     new_achievements.append({
@@ -582,44 +1120,51 @@ class GamifiedEducationAgent(BaseAgent):
         
         return new_achievements
     
-    def _check_achievement_condition(self, 
-                                   achievement: Achievement, 
-                                   progress: LearningProgress, 
-                                   response_time: float, 
-                                   is_correct: bool) -> bool:
-        """檢查成就解鎖條件"""
+    def _compile_achievement_condition(self,
+                                       condition: Dict[str, Any]
+                                       ) -> Callable[[LearningProgress, float, bool], bool]:
+        """將成就解鎖條件編譯為判斷函式，只保留條件中實際出現的檢查"""
         
-        condition = achievement.condition
+        checks: List[Callable[[LearningProgress, float, bool], bool]] = []
         
         if "questions_answered" in condition:
-            if progress.questions_answered < condition["questions_answered"]:
-                return False
+            required_answers = condition["questions_answered"]
+            checks.append(lambda progress, response_time, is_correct:
+                          progress.questions_answered >= required_answers)
         
         if "accuracy" in condition:
-            if progress.questions_answered < condition.get("min_questions", 1):
-                return False
-            accuracy = progress.correct_answers / progress.questions_answered
-            if accuracy < condition["accuracy"]:
-                return False
+            min_questions = condition.get("min_questions", 1)
+            required_accuracy = condition["accuracy"]
+            checks.append(lambda progress, response_time, is_correct:
+                          progress.questions_answered >= min_questions
+                          and progress.accuracy >= required_accuracy)
         
         if "streak_days" in condition:
-            if progress.current_streak < condition["streak_days"]:
-                return False
+            required_streak = condition["streak_days"]
+            checks.append(lambda progress, response_time, is_correct:
+                          progress.current_streak >= required_streak)
         
         if "response_time" in condition:
-            if response_time > condition["response_time"]:
-                return False
+            max_response_time = condition["response_time"]
+            checks.append(lambda progress, response_time, is_correct:
+                          response_time <= max_response_time)
         
         if "topics_mastered" in condition:
-            if len(progress.topics_mastered) < condition["topics_mastered"]:
-                return False
+            required_topics = condition["topics_mastered"]
+            checks.append(lambda progress, response_time, is_correct:
+                          len(progress.topics_mastered) >= required_topics)
         
-        return True
+        if len(checks) == 1:
+            return checks[0]
+        
+        return lambda progress, response_time, is_correct: all(
+            check(progress, response_time, is_correct) for check in checks
+        )
     
     def _check_level_up(self, progress: LearningProgress) -> Optional[Dict[str, Any]]:
         """檢查等級提升"""
         # 經驗值等級公式：level = floor(sqrt(experience / 100)) + 1
-        new_level = int((progress.total_experience / 100) ** 0.5) + 1
+        new_level = math.isqrt(progress.total_experience // 100) + 1
         
         if new_level > progress.current_level:
             old_level = progress.current_level
@@ -632,9 +1177,8 @@ class GamifiedEducationAgent(BaseAgent):
         
         return None
     
-    def _update_learning_streak(self, user_id: str):
+    def _update_learning_streak(self, progress: LearningProgress):
         """更新學習連續天數"""
-        progress = self.get_user_progress(user_id)
         today = datetime.now().date()
         last_activity_date = progress.last_activity.date()
         
@@ -651,11 +1195,81 @@ class GamifiedEducationAgent(BaseAgent):
         
         progress.last_activity = datetime.now()
     
-    def get_user_progress(self, user_id: str) -> LearningProgress:
+    async def get_user_progress(self, user_id: str) -> LearningProgress:
         """獲取用戶學習進度"""
-        if user_id not in self.user_progress:
-            self.user_progress[user_id] = LearningProgress(user_id=user_id)
-        return self.user_progress[user_id]
+        progress = self.user_progress.get(user_id)
+        if progress is not None:
+            self.user_progress.move_to_end(user_id)
+            return progress
+        
+        # sqlite 為同步I/O，於執行緒中執行以免阻塞事件循環
+        record = await asyncio.to_thread(self.progress_store.load, user_id) if self.progress_store else None
+        
+        # 等待讀取期間其他協程可能已載入同一用戶，沿用既有物件以免更新遺失
+        progress = self.user_progress.get(user_id)
+        if progress is not None:
+            return progress
+        progress = self._progress_from_record(record) if record else LearningProgress(user_id=user_id)
+        
+        self.user_progress[user_id] = progress
+        if self.progress_store and len(self.user_progress) > self._progress_cache_size:
+            # 已持久化的進度可安全移出快取
+            self.user_progress.popitem(last=False)
+        
+        return progress
+    
+    async def list_user_progress(self) -> List[LearningProgress]:
+        """列出所有用戶的學習進度（含未在快取中的已存儲用戶）"""
+        if not self.progress_store:
+            return list(self.user_progress.values())
+        
+        all_progress = {
+            record["user_id"]: self._progress_from_record(record)
+            for record in await asyncio.to_thread(self.progress_store.load_all)
+        }
+        all_progress.update(self.user_progress)
+        return list(all_progress.values())
+    
+    async def _save_user_progress(self, progress: LearningProgress):
+        """將用戶進度寫入持久化存儲"""
+        if self.progress_store:
+            await asyncio.to_thread(self.progress_store.save, self._progress_to_record(progress))
+    
+    def _progress_to_record(self, progress: LearningProgress) -> Dict[str, Any]:
+        """將學習進度轉換為存儲記錄"""
+        return {
+            "user_id": progress.user_id,
+            "total_experience": progress.total_experience,
+            "current_level": progress.current_level,
+            "current_streak": progress.current_streak,
+            "best_streak": progress.best_streak,
+            "questions_answered": progress.questions_answered,
+            "correct_answers": progress.correct_answers,
+            "last_activity": progress.last_activity.isoformat(),
+            "achievements": [
+                [achievement_id, unlocked_at.isoformat()]
+                for achievement_id, unlocked_at in progress.achievements.items()
+            ],
+            "topics_mastered": sorted(progress.topics_mastered)
+        }
+    
+    def _progress_from_record(self, record: Dict[str, Any]) -> LearningProgress:
+        """由存儲記錄還原學習進度"""
+        return LearningProgress(
+            user_id=record["user_id"],
+            total_experience=record["total_experience"],
+            current_level=record["current_level"],
+            current_streak=record["current_streak"],
+            best_streak=record["best_streak"],
+            topics_mastered=set(record["topics_mastered"]),
+            questions_answered=record["questions_answered"],
+            correct_answers=record["correct_answers"],
+            last_activity=datetime.fromisoformat(record["last_activity"]),
+            achievements={
+                achievement_id: datetime.fromisoformat(unlocked_at)
+                for achievement_id, unlocked_at in record["achievements"]
+            }
+        )
     
     def _adjust_difficulty(self, 
                           progress: LearningProgress, 
@@ -668,7 +1282,7 @@ class GamifiedEducationAgent(BaseAgent):
             return DifficultyLevel.BEGINNER
         
         # 計算準確率
-        accuracy = progress.correct_answers / progress.questions_answered
+        accuracy = progress.accuracy
         
         # 根據準確率調整難度
         if accuracy >= 0.8 and progress.current_level >= 3:
@@ -696,7 +1310,7 @@ class GamifiedEducationAgent(BaseAgent):
     
     async def get_learning_recommendations(self, user_id: str) -> Dict[str, Any]:
         """獲取個性化學習推薦"""
-        progress = self.get_user_progress(user_id)
+        progress = await self.get_user_progress(user_id)
         
         recommendations = {
             "next_topics": await self._recommend_topics(progress),
@@ -729,7 +1343,7 @@ class GamifiedEducationAgent(BaseAgent):
         if progress.questions_answered == 0:
             return DifficultyLevel.BEGINNER
         
-        accuracy = progress.correct_answers / progress.questions_answered
+        accuracy = progress.accuracy
         
         if accuracy >= 0.85 and progress.current_level >= 5:
             return DifficultyLevel.EXPERT
@@ -756,22 +1370,13 @@ class GamifiedEducationAgent(BaseAgent):
     
     def _get_motivational_message(self, progress: LearningProgress) -> str:
         """獲取激勵訊息"""
-        messages = [
-            f"你已經回答了{progress.questions_answered}個問題，繼續加油！",
-            f"你的學習等級是{progress.current_level}級，真了不起！",
-            f"連續學習{progress.current_streak}天，堅持就是勝利！",
-            f"正確率{progress.correct_answers / max(1, progress.questions_answered):.1%}，你的進步很明顯！"
-        ]
-        
-        return random.choice(messages)
+        return random.choice(_MOTIVATIONAL_TEMPLATES).format(progress=progress)
     
-    async def _handle_start_session(self, task: str) -> Dict[str, Any]:
+    async def _handle_start_session(self, args: List[str]) -> Dict[str, Any]:
         """處理開始學習會話請求"""
-        # 解析參數
-        parts = task.split("|")
-        user_id = parts[1] if len(parts) > 1 else "default_user"
-        topic = parts[2] if len(parts) > 2 else "HR基礎"
-        difficulty = DifficultyLevel(parts[3]) if len(parts) > 3 else DifficultyLevel.BEGINNER
+        user_id = args[0] if len(args) > 0 else "default_user"
+        topic = args[1] if len(args) > 1 else "HR基礎"
+        difficulty = DifficultyLevel(args[2]) if len(args) > 2 else DifficultyLevel.BEGINNER
         
         session = await self.start_learning_session(user_id, topic, difficulty)
         
@@ -785,24 +1390,22 @@ class GamifiedEducationAgent(BaseAgent):
                 "options": session.questions[0].options,
                 "type": session.questions[0].question_type.value
             },
-            "total_questions": len(session.questions)
+            "total_questions": session.total_questions
         }
     
-    async def _handle_answer_question(self, task: str) -> Dict[str, Any]:
+    async def _handle_answer_question(self, args: List[str]) -> Dict[str, Any]:
         """處理答案提交請求"""
-        parts = task.split("|")
-        session_id = parts[1] if len(parts) > 1 else ""
-        answer = parts[2] if len(parts) > 2 else ""
-        response_time = float(parts[3]) if len(parts) > 3 else 30.0
+        session_id = args[0] if len(args) > 0 else ""
+        answer = args[1] if len(args) > 1 else ""
+        response_time = float(args[2]) if len(args) > 2 else 30.0
         
         return await self.submit_answer(session_id, answer, response_time)
     
-    async def _handle_get_progress(self, task: str) -> Dict[str, Any]:
+    async def _handle_get_progress(self, args: List[str]) -> Dict[str, Any]:
         """處理獲取進度請求"""
-        parts = task.split("|")
-        user_id = parts[1] if len(parts) > 1 else "default_user"
+        user_id = args[0] if len(args) > 0 else "default_user"
         
-        progress = self.get_user_progress(user_id)
+        progress = await self.get_user_progress(user_id)
         recommendations = await self.get_learning_recommendations(user_id)
         
         return {
@@ -811,17 +1414,16 @@ class GamifiedEducationAgent(BaseAgent):
             "experience": progress.total_experience,
             "streak": progress.current_streak,
             "best_streak": progress.best_streak,
-            "accuracy": progress.correct_answers / max(1, progress.questions_answered),
+            "accuracy": progress.accuracy,
             "achievements_count": len(progress.achievements),
-            "topics_mastered": progress.topics_mastered,
+            "topics_mastered": sorted(progress.topics_mastered),
             "recommendations": recommendations
         }
     
-    async def _handle_generate_question(self, task: str) -> Dict[str, Any]:
+    async def _handle_generate_question(self, args: List[str]) -> Dict[str, Any]:
         """處理生成問題請求"""
-        parts = task.split("|")
-        topic = parts[1] if len(parts) > 1 else "HR"
-        difficulty = DifficultyLevel(parts[2]) if len(parts) > 2 else DifficultyLevel.BEGINNER
+        topic = args[0] if len(args) > 0 else "HR"
+        difficulty = DifficultyLevel(args[1]) if len(args) > 1 else DifficultyLevel.BEGINNER
         
         questions = await self._generate_questions(topic, difficulty, 1)
         question = questions[0] if questions else None
@@ -842,10 +1444,11 @@ class GamifiedEducationAgent(BaseAgent):
     async def _handle_general_inquiry(self, task: str) -> Dict[str, Any]:
         """處理一般查詢"""
         # 使用RAG系統回答一般問題，但加上遊戲化元素
-        rag_result = await self.rag_agent.query(task)
-        
-        # 添加學習建議
-        learning_suggestion = await self._suggest_related_learning(task)
+        # 知識查詢與學習建議互不依賴，並行執行
+        rag_result, learning_suggestion = await asyncio.gather(
+            self.rag_agent.query(task),
+            self._suggest_related_learning(task)
+        )
         
         return {
             "answer": rag_result.answer,
@@ -863,5 +1466,5 @@ class GamifiedEducationAgent(BaseAgent):
         保持簡潔且具有吸引力。
         """
         
-        response = await self.llm.ainvoke([{"role": "user", "content": suggestion_prompt}])
+        response = await invoke_llm(self.llm, [{"role": "user", "content": suggestion_prompt}])
         return response.content.strip()
\ No newline at end of file
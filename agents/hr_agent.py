@@ -1,61 +1,110 @@
 from langchain.agents import Tool, AgentExecutor, LLMSingleActionAgent
-from langchain.memory import ConversationBufferMemory
-from langchain.chat_models import ChatOpenAI
+from langchain.memory import ConversationSummaryBufferMemory
 from langchain.prompts import MessagesPlaceholder
-from langchain.schema import SystemMessage
+from langchain.schema import HumanMessage, SystemMessage
 from langchain.tools import BaseTool
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from loguru import logger
-import os
+import asyncio
 from dotenv import load_dotenv
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+from .llm_cache import SemanticLLMCache
+from .llm_pool import get_embeddings, get_llm, invoke_llm
 
 # 載入環境變量
 load_dotenv()
 
+
+@lru_cache(maxsize=4)
+def _get_encoding(model_name: str):
+    return tiktoken.encoding_for_model(model_name)
+
+
+def _truncate_to_tokens(text: str, max_tokens: int, model_name: str = "gpt-4") -> str:
+    """將文字截斷至指定 token 數以內"""
+    if tiktoken is None:
+        # 未安裝 tiktoken 時以字元數估算，中文約一字一 token
+        return text[:max_tokens]
+
+    encoding = _get_encoding(model_name)
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
 class HRKnowledgeBaseTool(BaseTool):
     name = "hr_knowledge_base"
     description = "用於查詢 HR 相關知識和法規的工具"
+    # 共用的 ChromaVectorStore，未提供時使用示例回答
+    vector_store: Optional[Any] = None
+    # 限制放入提示詞的法規數量與每條長度，控制輸入 token 成本
+    max_laws: int = 5
+    max_tokens_per_law: int = 400
 
     def _run(self, query: str) -> str:
         # TODO: 實現向量數據庫查詢
         return "這是一個示例回答"
 
     async def _arun(self, query: str) -> str:
-        # TODO: 實現異步查詢
-        return await self._run(query)
+        if self.vector_store is None:
+            # 同步查詢移至執行緒執行，避免阻塞事件迴圈
+            return await asyncio.to_thread(self._run, query)
 
-class HRAgent:
-    def __init__(self):
-        self.llm = ChatOpenAI(
-            temperature=0.7,
-            model_name="gpt-4",
-            api_key=os.getenv("OPENAI_API_KEY")
+        relevant_laws = await self.vector_store.search_laws(query)
+        relevant_laws = sorted(
+            relevant_laws, key=lambda law: law.get('relevance_score', 0), reverse=True
+        )[:self.max_laws]
+        return "\n\n".join(
+            _truncate_to_tokens(law['content'], self.max_tokens_per_law)
+            for law in relevant_laws
         )
+
+class HRAgent:
+    # 系統提示不依賴實例狀態，所有實例共用同一物件
+    _SYSTEM_MESSAGE = SystemMessage(
+        content="""你是一個專業的人力資源 AI 助手。你的主要職責包括：
+            1. 回答 HR 相關問題
+            2. 解釋勞動法規
+            3. 提供人資政策建議
+            4. 協助處理員工關係問題
+
+            請始終保持專業、客觀，並基於最新的法規和最佳實踐提供建議。"""
+    )
+
+    def __init__(self, vector_store: Optional[Any] = None):
+        self.llm = get_llm("gpt-4", 0.7)
         
         self.tools = [
-            HRKnowledgeBaseTool(),
+            HRKnowledgeBaseTool(vector_store=vector_store),
             # TODO: 添加更多工具
         ]
         
-        self.memory = ConversationBufferMemory(
+        # 對話超過 token 上限時，較早的內容以低成本模型摘要，避免歷史無限增長
+        self.memory = ConversationSummaryBufferMemory(
+            llm=get_llm("gpt-3.5-turbo", 0.0),
+            max_token_limit=2000,
             memory_key="chat_history",
             return_messages=True
         )
         
-        self.system_message = SystemMessage(
-            content="""你是一個專業的人力資源 AI 助手。你的主要職責包括：
-            1. 回答 HR 相關問題
-            2. 解釋勞動法規
-            3. 提供人資政策建議
-            4. 協助處理員工關係問題
-            
-            請始終保持專業、客觀，並基於最新的法規和最佳實踐提供建議。"""
-        )
+        self.system_message = self._SYSTEM_MESSAGE
+        
+        # 語意相近的重複問題直接重用先前的回答
+        self.response_cache = SemanticLLMCache(get_embeddings())
 
     async def process_question(self, question: str) -> Dict[str, Any]:
         try:
             # TODO: 實現完整的問答流程
-            response = await self.llm.apredict(question)
+            response = await self.response_cache.get_or_predict(
+                question, lambda: self._predict_with_system(question)
+            )
             return {
                 "answer": response,
                 "sources": [],
@@ -65,6 +114,11 @@ class HRAgent:
             logger.error(f"處理問題時發生錯誤：{str(e)}")
             raise
 
+    async def _predict_with_system(self, question: str) -> str:
+        """連同系統提示呼叫LLM；系統提示固定置於開頭，讓供應商的前綴快取得以命中"""
+        response = await invoke_llm(self.llm, [self.system_message, HumanMessage(content=question)])
+        return response.content
+
     async def search_regulations(self, query: str) -> List[Dict[str, Any]]:
         try:
             # TODO: 實現法規搜索
@@ -0,0 +1,168 @@
+"""
+Semantic LLM Response Cache
+語意回應快取 - 以嵌入向量相似度重用相近任務的LLM回應
+"""
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import numpy as np
+import os
+import re
+import time
+from loguru import logger
+
+
+# 預設相似度門檻；法規問答中措辭相近但內容不同的問題很多，門檻偏嚴
+_DEFAULT_THRESHOLD = float(os.getenv("LLM_CACHE_THRESHOLD", "0.97"))
+_DEFAULT_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+
+# 國家別名 -> 代碼；問題提及的國家不同時即使語意相近也不可共用回答
+_COUNTRY_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "TW": ("台灣", "臺灣", "taiwan"),
+    "JP": ("日本", "japan"),
+    "CN": ("中國", "大陸", "china"),
+    "HK": ("香港", "hong kong"),
+    "US": ("美國", "united states", "usa"),
+    "KR": ("韓國", "korea"),
+    "SG": ("新加坡", "singapore"),
+    "VN": ("越南", "vietnam"),
+    "TH": ("泰國", "thailand"),
+    "MY": ("馬來西亞", "malaysia"),
+    "PH": ("菲律賓", "philippines"),
+    "IN": ("印度", "india"),
+}
+_COUNTRY_CODES = {alias: code for code, aliases in _COUNTRY_ALIASES.items() for alias in aliases}
+_COUNTRY_PATTERN = re.compile(
+    "|".join(
+        # 英文別名需完整單字，避免 "usage" 被視為 "usa"
+        rf"(?<![a-z]){re.escape(alias)}(?![a-z])" if alias.isascii() else re.escape(alias)
+        for alias in sorted(_COUNTRY_CODES, key=len, reverse=True)
+    ),
+    re.IGNORECASE
+)
+# 條文編號，例如「第24條」、「Article 32」
+_ARTICLE_PATTERN = re.compile(r"第\s*(\d+(?:-\d+)?)\s*條|article\s+(\d+(?:-\d+)?)", re.IGNORECASE)
+
+
+def derive_partition(text: str) -> str:
+    """以文字中提及的國家與條文編號組成分區鍵，只有分區相同的項目才會比對相似度"""
+    countries = sorted({_COUNTRY_CODES[match.group(0).lower()] for match in _COUNTRY_PATTERN.finditer(text)})
+    articles = sorted({match.group(1) or match.group(2) for match in _ARTICLE_PATTERN.finditer(text)})
+    return f"{','.join(countries)}|{','.join(articles)}"
+
+
+def _quantize(vector: np.ndarray) -> Tuple[np.ndarray, float]:
+    """以最大絕對值為基準將向量對稱量化為 int8，返回 (量化向量, 縮放係數)"""
+    peak = float(np.max(np.abs(vector))) if vector.size else 0.0
+    if not peak:
+        return np.zeros(vector.shape, dtype=np.int8), 1.0
+    scale = peak / 127
+    return np.clip(np.rint(vector / scale), -127, 127).astype(np.int8), scale
+
+
+class SemanticLLMCache:
+    """
+    以餘弦相似度比對任務文字的記憶體內LLM回應快取
+
+    向量正規化後量化為 int8 並記錄逐列縮放係數，存放於固定大小的環狀矩陣，
+    記憶體用量約為 float32 的四分之一；查詢時以一次整數矩陣乘法再乘回縮放
+    係數，算出與所有快取項目的相似度；超過上限時覆寫最舊的項目。
+
+    每個項目屬於一個分區（預設由提及的國家與條文編號推導），只與同分區的
+    項目比對；超過 ttl 秒的項目視為過期。
+    """
+
+    def __init__(self, embeddings: Any, threshold: float = _DEFAULT_THRESHOLD,
+                 max_entries: int = 1024, ttl: float = _DEFAULT_TTL):
+        # embeddings 需提供 LangChain Embeddings 介面的 aembed_query
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._vectors: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._created = np.full(max_entries, -np.inf)
+        self._slot_partitions = np.full(max_entries, -1, dtype=np.int32)
+        self._partition_ids: Dict[str, int] = {}
+        self._responses: List[Any] = []
+        self._next_slot = 0
+
+    async def get_or_predict(self, text: str, predict: Callable[[], Awaitable[Any]],
+                             partition: Optional[str] = None) -> Any:
+        """返回相近任務的快取回應，未命中時呼叫 predict 並寫入快取；partition 未指定時由文字推導"""
+        if partition is None:
+            partition = derive_partition(text)
+
+        try:
+            vector = await self._embed(text)
+        except Exception as e:
+            # 嵌入失敗時不影響主要流程，直接呼叫LLM
+            logger.warning(f"SemanticLLMCache - 生成嵌入向量失敗: {str(e)}")
+            return await predict()
+
+        cached = self.get(vector, partition)
+        if cached is not None:
+            return cached
+
+        response = await predict()
+        self.put(vector, response, partition)
+        return response
+
+    def get(self, vector: np.ndarray, partition: str = "") -> Optional[Any]:
+        """查詢同分區內未過期且與已正規化向量最相似的快取回應，低於門檻時返回None"""
+        partition_id = self._partition_ids.get(partition)
+        if partition_id is None or not self._responses:
+            return None
+
+        count = len(self._responses)
+        valid = (self._slot_partitions[:count] == partition_id) & (
+            time.monotonic() - self._created[:count] < self.ttl
+        )
+        if not valid.any():
+            return None
+
+        quantized, scale = _quantize(vector)
+        scores = (self._vectors[:count].astype(np.int32) @ quantized.astype(np.int32)) * (self._scales[:count] * scale)
+        scores[~valid] = -np.inf
+        best = int(np.argmax(scores))
+        return self._responses[best] if scores[best] >= self.threshold else None
+
+    def put(self, vector: np.ndarray, response: Any, partition: str = "") -> None:
+        """寫入快取，已滿時覆寫最舊的項目"""
+        if self._vectors is None:
+            self._vectors = np.empty((self.max_entries, vector.shape[0]), dtype=np.int8)
+            self._scales = np.empty(self.max_entries, dtype=np.float32)
+
+        partition_id = self._partition_ids.setdefault(partition, len(self._partition_ids))
+
+        slot = self._next_slot
+        self._vectors[slot], self._scales[slot] = _quantize(vector)
+        self._created[slot] = time.monotonic()
+        self._slot_partitions[slot] = partition_id
+        if slot < len(self._responses):
+            self._responses[slot] = response
+        else:
+            self._responses.append(response)
+        self._next_slot = (slot + 1) % self.max_entries
+
+    def invalidate(self, partition: str) -> None:
+        """使指定分區的所有項目失效（例如該國法規更新後）"""
+        partition_id = self._partition_ids.get(partition)
+        if partition_id is not None:
+            self._created[self._slot_partitions == partition_id] = -np.inf
+
+    def clear(self) -> None:
+        """清除所有快取項目"""
+        self._vectors = None
+        self._scales = None
+        self._created.fill(-np.inf)
+        self._slot_partitions.fill(-1)
+        self._partition_ids = {}
+        self._responses = []
+        self._next_slot = 0
+
+    async def _embed(self, text: str) -> np.ndarray:
+        """生成單位長度的嵌入向量"""
+        vector = np.asarray(await self.embeddings.aembed_query(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
@@ -0,0 +1,125 @@
+"""
+LLM Client Pool
+LLM客戶端池 - 讓所有Agent共用相同設定的LLM與嵌入模型客戶端
+"""
+
+from collections import deque
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, AsyncIterator, Deque, List, Tuple
+from langchain.chat_models import ChatOpenAI
+from langchain.embeddings import OpenAIEmbeddings
+from loguru import logger
+import asyncio
+import os
+import random
+import time
+import weakref
+from dotenv import load_dotenv
+
+try:
+    from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+    _RETRYABLE_LLM_ERRORS: Tuple[type, ...] = (
+        RateLimitError, APITimeoutError, APIConnectionError, InternalServerError
+    )
+except ImportError:
+    _RETRYABLE_LLM_ERRORS = ()
+
+load_dotenv()
+
+# 所有Agent共用的LLM並行上限與每分鐘請求上限（0 表示不限制）
+_LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "16"))
+_LLM_RPM_LIMIT = int(os.getenv("LLM_RPM_LIMIT", "500"))
+
+# 重試設定：隨機指數退避（full jitter），避免多個請求同時重試
+_LLM_MAX_ATTEMPTS = 5
+_LLM_BACKOFF_MIN = 1.0
+_LLM_BACKOFF_MAX = 30.0
+
+
+class _RequestRateLimiter:
+    """以滑動視窗限制每分鐘請求數，額度用盡時等待最舊的請求滑出視窗"""
+
+    def __init__(self, max_per_minute: int, window: float = 60.0):
+        self.max_per_minute = max_per_minute
+        self.window = window
+        self._timestamps: Deque[float] = deque()
+        # 在事件迴圈內建立，Python 3.9 的 Lock 會綁定建立時的迴圈
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.max_per_minute <= 0:
+            return
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._timestamps and now - self._timestamps[0] >= self.window:
+                    self._timestamps.popleft()
+                if len(self._timestamps) < self.max_per_minute:
+                    self._timestamps.append(now)
+                    return
+                await asyncio.sleep(self.window - (now - self._timestamps[0]))
+
+
+# 非同步原語依事件迴圈建立：Python 3.9 的 Semaphore/Lock 會綁定建立時的迴圈，
+# 於匯入時建立會在 uvicorn 啟動自己的迴圈後出現 "attached to a different loop"
+_llm_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+_llm_rate_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _RequestRateLimiter]" = weakref.WeakKeyDictionary()
+
+
+def get_llm_semaphore() -> asyncio.Semaphore:
+    """取得目前事件迴圈共用的LLM並行上限，首次使用時建立"""
+    loop = asyncio.get_running_loop()
+    semaphore = _llm_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _llm_semaphores[loop] = asyncio.Semaphore(_LLM_CONCURRENCY)
+    return semaphore
+
+
+def get_llm_rate_limiter() -> _RequestRateLimiter:
+    """取得目前事件迴圈共用的每分鐘請求限制器，首次使用時建立"""
+    loop = asyncio.get_running_loop()
+    limiter = _llm_rate_limiters.get(loop)
+    if limiter is None:
+        limiter = _llm_rate_limiters[loop] = _RequestRateLimiter(_LLM_RPM_LIMIT)
+    return limiter
+
+
+@lru_cache(maxsize=16)
+def get_llm(model_name: str = "gpt-4", temperature: float = 0.7) -> ChatOpenAI:
+    """取得指定模型與溫度的共用LLM客戶端，相同設定共用同一連線池"""
+    return ChatOpenAI(
+        temperature=temperature,
+        model_name=model_name,
+        api_key=os.getenv("OPENAI_API_KEY")
+    )
+
+
+@lru_cache(maxsize=1)
+def get_embeddings() -> OpenAIEmbeddings:
+    """取得共用的嵌入模型客戶端"""
+    return OpenAIEmbeddings(api_key=os.getenv("OPENAI_API_KEY"))
+
+
+@asynccontextmanager
+async def llm_slot() -> AsyncIterator[None]:
+    """取得一次LLM呼叫的額度：先通過每分鐘請求上限，再佔用並行名額直到離開區塊"""
+    await get_llm_rate_limiter().acquire()
+    async with get_llm_semaphore():
+        yield
+
+
+async def invoke_llm(llm: ChatOpenAI, messages: List[Any]) -> Any:
+    """在並行與每分鐘請求上限內呼叫LLM，遇到限流、逾時或伺服器錯誤時以隨機指數退避重試"""
+    for attempt in range(1, _LLM_MAX_ATTEMPTS + 1):
+        try:
+            # 只在實際呼叫期間佔用並行名額，退避等待時釋放給其他請求
+            async with llm_slot():
+                return await llm.ainvoke(messages)
+        except _RETRYABLE_LLM_ERRORS as e:
+            if attempt == _LLM_MAX_ATTEMPTS:
+                raise
+            delay = random.uniform(_LLM_BACKOFF_MIN, min(_LLM_BACKOFF_MAX, _LLM_BACKOFF_MIN * 2 ** attempt))
+            logger.warning(f"LLM呼叫失敗，{delay:.1f}秒後重試（第{attempt}次）: {str(e)}")
+            await asyncio.sleep(delay)
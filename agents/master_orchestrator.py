@@ -3,16 +3,79 @@ Master Orchestrator - RAG Knowledge Management System
 專門管理RAG智能知識助手，提供統一的知識查詢服務
 """
 
-from typing import Dict, Any, List, Optional, Tuple
-from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Pattern, Tuple
+from collections import Counter, OrderedDict, defaultdict
+from dataclasses import asdict, dataclass, replace
 from enum import Enum
+from functools import lru_cache
+from operator import itemgetter
 import asyncio
+import copy
+import hashlib
+import heapq
 import json
-from datetime import datetime, timedelta
+import math
+import os
+import re
+import time
 import logging
 from .base_agent import BaseAgent
 from .rag_knowledge_agent import RAGKnowledgeAgent, QueryResult, DocumentInfo
 
+logger = logging.getLogger(__name__)
+
+# 風險關鍵詞預先編譯為單一正則，每個風險只需掃描一次
+_CRITICAL_KEYWORDS = frozenset(['critical', 'severe', 'immediate'])
+_EMERGENCY_KEYWORDS = frozenset(['critical', 'immediate', 'urgent', 'crisis', 'severe'])
+_CRITICAL_PATTERN = re.compile("|".join(sorted(_CRITICAL_KEYWORDS)))
+_EMERGENCY_PATTERN = re.compile("|".join(sorted(_EMERGENCY_KEYWORDS)))
+
+# 緊急響應建議的共用欄位與成功指標
+_EMERGENCY_RECOMMENDATION_BASE = {
+    'scope': 'organization',
+    'urgency': 'critical',
+    'weight': 1.0,
+    'type': 'emergency_response'
+}
+_EMERGENCY_SUCCESS_METRICS = ('Crisis resolution within 48 hours', 'Risk mitigation effectiveness >90%')
+
+# 相同上下文的分析結果緩存時間（秒）與項目上限
+_RESULT_CACHE_TTL = 60.0
+_RESULT_CACHE_MAX_ENTRIES = 128
+
+# 時間線與成功指標只取權重最高的建議數量
+_TOP_RECOMMENDATIONS = 15
+
+
+def _timeline_rule(urgency: str, complexity: str) -> Optional[str]:
+    """依緊急程度與複雜度決定實施時段；返回None表示取決於 strategic_importance"""
+    if urgency == 'critical' or complexity == 'low':
+        return 'immediate'
+    if urgency == 'high' and complexity == 'medium':
+        return 'short_term'
+    if complexity == 'high':
+        return 'long_term'
+    return None
+
+
+# 常見 (urgency, complexity) 組合預先查表，未列入的組合再套用規則
+_TIMELINE_MAP = {
+    (urgency, complexity): _timeline_rule(urgency, complexity)
+    for urgency in ('critical', 'high', 'medium', 'low')
+    for complexity in ('low', 'medium', 'high')
+}
+
+# 依建議權重排序的鍵
+_by_weight = itemgetter('weight')
+
+
+@lru_cache(maxsize=64)
+def _compile_goal_pattern(goals: Tuple[str, ...]) -> Optional[Pattern[str]]:
+    """將業務目標編譯為單一正則，相同的目標組合重用同一個編譯結果"""
+    if not goals:
+        return None
+    return re.compile("|".join(map(re.escape, goals)))
+
 
 class Priority(Enum):
     CRITICAL = "critical"
@@ -24,6 +87,10 @@ class Priority(Enum):
 @dataclass
 class AnalysisContext:
     """分析上下文數據結構"""
+    __slots__ = (
+        'employee_data', 'organizational_data', 'priority_goals',
+        'time_horizon', 'urgency_level', 'business_context'
+    )
     employee_data: Dict[str, Any]
     organizational_data: Dict[str, Any] 
     priority_goals: List[str]
@@ -35,6 +102,11 @@ class AnalysisContext:
 @dataclass
 class AgentInsight:
     """智能體洞察結果"""
+    # risk_factors_lower 不是 dataclass 欄位，由 __post_init__ 自 risk_factors 推導
+    __slots__ = (
+        'agent_name', 'recommendations', 'confidence_score', 'risk_factors',
+        'opportunities', 'data_quality_score', 'processing_time', 'risk_factors_lower'
+    )
     agent_name: str
     recommendations: List[Dict[str, Any]]
     confidence_score: float
@@ -42,16 +114,24 @@ class AgentInsight:
     opportunities: List[str]
     data_quality_score: float
     processing_time: float
+    
+    def __post_init__(self):
+        # 建構時即轉為小寫，整合與緊急檢查不必重複轉換
+        self.risk_factors_lower = tuple(risk.lower() for risk in self.risk_factors)
 
 
 @dataclass
 class IntegratedStrategy:
     """整合策略輸出"""
+    __slots__ = (
+        'individual_recommendations', 'team_recommendations', 'organizational_recommendations',
+        'priority_score', 'implementation_timeline', 'success_metrics', 'risk_mitigation'
+    )
     individual_recommendations: List[Dict[str, Any]]
     team_recommendations: List[Dict[str, Any]]
     organizational_recommendations: List[Dict[str, Any]]
     priority_score: float
-    implementation_timeline: Dict[str, str]
+    implementation_timeline: Dict[str, List[str]]
     success_metrics: List[str]
     risk_mitigation: List[str]
 
@@ -59,8 +139,20 @@ class IntegratedStrategy:
 class StrategicDecisionEngine:
     """戰略決策引擎 - 整合多智能體洞察"""
     
+    # (關鍵詞, 成功指標) 對照表，依序比對
+    _GOAL_METRIC_TABLE = (
+        ('retention', 'Employee retention rate increase >15%'),
+        ('satisfaction', 'Employee satisfaction score >4.2/5.0'),
+        ('performance', 'Team performance metrics improvement >20%'),
+        ('efficiency', 'HR process efficiency improvement >40%'),
+    )
+    _TYPE_METRIC_TABLE = (
+        ('learning', 'Learning completion rate >85%'),
+        ('culture', 'Culture health index improvement >25%'),
+        ('talent', 'Internal promotion rate >30%'),
+    )
+    
     def __init__(self):
-        self.logger = logging.getLogger(__name__)
         self.decision_history = []
         
     def integrate_recommendations(
@@ -70,127 +162,119 @@ class StrategicDecisionEngine:
     ) -> IntegratedStrategy:
         """整合各智能體建議並生成統一策略"""
         
-        # Step 1: 信心度加權整合
-        weighted_recommendations = self._weight_by_confidence(insights)
+        goal_pattern = _compile_goal_pattern(tuple(context.priority_goals))
         
-        # Step 2: 優先級評分
-        priority_scores = self._calculate_priority_scores(weighted_recommendations, context)
+        weighted_recommendations = []
+        scope_buckets = {'individual': [], 'team': [], 'organization': []}
+        priority_scores = {}
+        risk_frequency = Counter()
+        risk_lower = {}
         
-        # Step 3: 風險評估整合
-        integrated_risks = self._integrate_risk_assessment(insights)
+        # Step 1: 單次走訪所有洞察，同時完成信心度加權、層面分組、優先級評分與風險統計
+        for agent_name, insight in insights.items():
+            weight = insight.confidence_score * insight.data_quality_score
+            
+            for recommendation in insight.recommendations:
+                weighted_recommendation = {
+                    **recommendation,
+                    'source_agent': agent_name,
+                    'weight': weight,
+                    'original_confidence': insight.confidence_score
+                }
+                weighted_recommendations.append(weighted_recommendation)
+                
+                bucket = scope_buckets.get(recommendation.get('scope'))
+                if bucket is not None:
+                    bucket.append(weighted_recommendation)
+                
+                priority_scores[recommendation.get('id', 'unknown')] = self._calculate_priority_score(
+                    weighted_recommendation, goal_pattern, context
+                )
+            
+            risk_frequency.update(insight.risk_factors)
+            risk_lower.update(zip(insight.risk_factors, insight.risk_factors_lower))
+        
+        # 時間線與成功指標只需要權重最高的建議
+        top_recommendations = heapq.nlargest(_TOP_RECOMMENDATIONS, weighted_recommendations, key=_by_weight)
+        
+        # Step 2: 風險評估整合
+        integrated_risks = self._integrate_risk_assessment(risk_frequency, risk_lower)
         
-        # Step 4: 機會整合
+        # Step 3: 機會整合
         integrated_opportunities = self._integrate_opportunities(insights)
         
-        # Step 5: 生成實施時間線
+        # Step 4: 生成實施時間線
         timeline = self._generate_implementation_timeline(
-            weighted_recommendations, context
+            top_recommendations, context
         )
         
-        # Step 6: 定義成功指標
+        # Step 5: 定義成功指標
         success_metrics = self._define_success_metrics(
-            weighted_recommendations, context
+            top_recommendations, context
         )
         
         return IntegratedStrategy(
-            individual_recommendations=self._extract_individual_recommendations(weighted_recommendations),
-            team_recommendations=self._extract_team_recommendations(weighted_recommendations),
-            organizational_recommendations=self._extract_org_recommendations(weighted_recommendations),
+            individual_recommendations=heapq.nlargest(5, scope_buckets['individual'], key=_by_weight),
+            team_recommendations=heapq.nlargest(5, scope_buckets['team'], key=_by_weight),
+            organizational_recommendations=heapq.nlargest(5, scope_buckets['organization'], key=_by_weight),
             priority_score=max(priority_scores.values()) if priority_scores else 0.5,
             implementation_timeline=timeline,
             success_metrics=success_metrics,
             risk_mitigation=integrated_risks
         )
     
-    def _weight_by_confidence(self, insights: Dict[str, AgentInsight]) -> List[Dict[str, Any]]:
-        """基於信心度對建議進行加權"""
-        weighted_recommendations = []
-        
-        for agent_name, insight in insights.items():
-            weight = insight.confidence_score * insight.data_quality_score
-            
-            for recommendation in insight.recommendations:
-                weighted_recommendation = {
-                    **recommendation,
-                    'source_agent': agent_name,
-                    'weight': weight,
-                    'original_confidence': insight.confidence_score
-                }
-                weighted_recommendations.append(weighted_recommendation)
-        
-        # 按權重排序
-        weighted_recommendations.sort(key=lambda x: x['weight'], reverse=True)
-        return weighted_recommendations
-    
-    def _calculate_priority_scores(
+    def _calculate_priority_score(
         self, 
-        recommendations: List[Dict[str, Any]], 
+        recommendation: Dict[str, Any], 
+        goal_pattern: Optional[Pattern[str]],
         context: AnalysisContext
-    ) -> Dict[str, float]:
-        """計算優先級評分"""
-        priority_scores = {}
+    ) -> float:
+        """計算單一建議的優先級評分"""
+        score = recommendation.get('weight', 0.5)
         
-        for rec in recommendations:
-            score = rec.get('weight', 0.5)
-            
-            # 根據業務目標調整優先級
-            if any(goal in rec.get('description', '') for goal in context.priority_goals):
-                score *= 1.3
-            
-            # 根據緊急程度調整
-            if context.urgency_level == Priority.CRITICAL:
-                score *= 1.5
-            elif context.urgency_level == Priority.HIGH:
-                score *= 1.2
-            
-            priority_scores[rec.get('id', 'unknown')] = min(score, 1.0)
+        # 根據業務目標調整優先級
+        if goal_pattern and goal_pattern.search(recommendation.get('description', '')):
+            score *= 1.3
         
-        return priority_scores
+        # 根據緊急程度調整
+        if context.urgency_level == Priority.CRITICAL:
+            score *= 1.5
+        elif context.urgency_level == Priority.HIGH:
+            score *= 1.2
+        
+        return min(score, 1.0)
     
-    def _integrate_risk_assessment(self, insights: Dict[str, AgentInsight]) -> List[str]:
+    def _integrate_risk_assessment(self, risk_frequency: Counter, risk_lower: Dict[str, str]) -> List[str]:
         """整合風險評估"""
-        all_risks = []
-        risk_frequency = {}
-        
-        for insight in insights.values():
-            for risk in insight.risk_factors:
-                all_risks.append(risk)
-                risk_frequency[risk] = risk_frequency.get(risk, 0) + 1
-        
         # 只返回被多個智能體識別的高風險項目
         critical_risks = [
             risk for risk, freq in risk_frequency.items() 
-            if freq >= 2 or any(keyword in risk.lower() for keyword in ['critical', 'severe', 'immediate'])
+            if freq >= 2 or _CRITICAL_PATTERN.search(risk_lower[risk])
         ]
         
         return critical_risks
     
     def _integrate_opportunities(self, insights: Dict[str, AgentInsight]) -> List[str]:
         """整合機會分析"""
-        all_opportunities = []
-        opportunity_scores = {}
+        opportunity_scores = defaultdict(list)
         
-        for agent_name, insight in insights.values():
+        for insight in insights.values():
             for opportunity in insight.opportunities:
-                if opportunity not in opportunity_scores:
-                    opportunity_scores[opportunity] = []
-                
                 opportunity_scores[opportunity].append(insight.confidence_score)
         
-        # 按平均信心度排序機會
-        sorted_opportunities = sorted(
-            opportunity_scores.items(),
-            key=lambda x: sum(x[1]) / len(x[1]),
-            reverse=True
-        )
+        # 平均信心度只計算一次，再取前10個機會
+        mean_scores = [
+            (opportunity, math.fsum(scores) / len(scores))
+            for opportunity, scores in opportunity_scores.items()
+        ]
         
-        return [opp[0] for opp in sorted_opportunities[:10]]  # 返回前10個機會
+        return [opportunity for opportunity, _ in heapq.nlargest(10, mean_scores, key=itemgetter(1))]
     
     def _generate_implementation_timeline(
         self,
         recommendations: List[Dict[str, Any]],
         context: AnalysisContext
-    ) -> Dict[str, str]:
+    ) -> Dict[str, List[str]]:
         """生成實施時間線"""
         timeline = {
             'immediate': [],  # 0-2 weeks
@@ -199,18 +283,13 @@ class StrategicDecisionEngine:
             'long_term': []  # 6+ months
         }
         
-        for rec in recommendations[:15]:  # 只處理前15個高優先級建議
-            urgency = rec.get('urgency', 'medium')
-            complexity = rec.get('complexity', 'medium')
+        for rec in recommendations:
+            key = (rec.get('urgency', 'medium'), rec.get('complexity', 'medium'))
+            bucket = _TIMELINE_MAP[key] if key in _TIMELINE_MAP else _timeline_rule(*key)
+            if bucket is None:
+                bucket = 'long_term' if rec.get('strategic_importance') == 'high' else 'medium_term'
             
-            if urgency == 'critical' or complexity == 'low':
-                timeline['immediate'].append(rec.get('title', 'Unknown task'))
-            elif urgency == 'high' and complexity == 'medium':
-                timeline['short_term'].append(rec.get('title', 'Unknown task'))
-            elif complexity == 'high' or rec.get('strategic_importance') == 'high':
-                timeline['long_term'].append(rec.get('title', 'Unknown task'))
-            else:
-                timeline['medium_term'].append(rec.get('title', 'Unknown task'))
+            timeline[bucket].append(rec.get('title', 'Unknown task'))
         
         return timeline
     
@@ -220,42 +299,26 @@ class StrategicDecisionEngine:
         context: AnalysisContext
     ) -> List[str]:
         """定義成功指標"""
-        metrics = set()
+        # 以字典保留加入順序並去重
+        metrics = {}
         
-        # 基於業務目標的指標
+        # 基於業務目標的指標，每個目標取第一個符合的關鍵詞
         for goal in context.priority_goals:
-            if 'retention' in goal.lower():
-                metrics.add('Employee retention rate increase >15%')
-            elif 'satisfaction' in goal.lower():
-                metrics.add('Employee satisfaction score >4.2/5.0')
-            elif 'performance' in goal.lower():
-                metrics.add('Team performance metrics improvement >20%')
-            elif 'efficiency' in goal.lower():
-                metrics.add('HR process efficiency improvement >40%')
+            goal_lower = goal.lower()
+            for keyword, metric in self._GOAL_METRIC_TABLE:
+                if keyword in goal_lower:
+                    metrics[metric] = None
+                    break
         
         # 基於建議類型的指標
         for rec in recommendations[:10]:
             rec_type = rec.get('type', '')
-            if 'learning' in rec_type:
-                metrics.add('Learning completion rate >85%')
-            elif 'culture' in rec_type:
-                metrics.add('Culture health index improvement >25%')
-            elif 'talent' in rec_type:
-                metrics.add('Internal promotion rate >30%')
+            for keyword, metric in self._TYPE_METRIC_TABLE:
+                if keyword in rec_type:
+                    metrics[metric] = None
+                    break
         
         return list(metrics)[:8]  # 限制指標數量
-    
-    def _extract_individual_recommendations(self, recommendations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """提取個人層面建議"""
-        return [rec for rec in recommendations if rec.get('scope') == 'individual'][:5]
-    
-    def _extract_team_recommendations(self, recommendations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """提取團隊層面建議"""
-        return [rec for rec in recommendations if rec.get('scope') == 'team'][:5]
-    
-    def _extract_org_recommendations(self, recommendations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """提取組織層面建議"""
-        return [rec for rec in recommendations if rec.get('scope') == 'organization'][:5]
 
 
 class MasterOrchestrator(BaseAgent):
@@ -271,19 +334,55 @@ class MasterOrchestrator(BaseAgent):
             'process': ProcessAgent()
         }
         self.decision_engine = StrategicDecisionEngine()
-        self.logger = logging.getLogger(__name__)
+        # 限制同時進行的智能體分析數量，避免LLM/RAG呼叫無上限地擴散
+        self._analysis_semaphore = asyncio.Semaphore(int(os.getenv("ORCH_MAX_INFLIGHT", "4")))
+        # 相同上下文的分析結果：context_key -> (寫入時間, 策略)，依寫入順序淘汰
+        self._result_cache: "OrderedDict[bytes, Tuple[float, IntegratedStrategy]]" = OrderedDict()
+        # 進行中的分析：context_key -> Future，相同上下文的並行請求共用同一次執行
+        self._pending_analyses: Dict[bytes, asyncio.Future] = {}
         
     async def analyze_comprehensive(self, context: AnalysisContext) -> IntegratedStrategy:
-        """進行全面分析和策略整合"""
-        start_time = datetime.now()
+        """進行全面分析和策略整合，短時間內相同的上下文直接返回先前結果的副本"""
+        context_key = self._context_key(context)
+        
+        # 緩存與共用的結果會交給多個呼叫端，各自取得深拷貝，避免修改時互相影響
+        cached = self._result_cache.get(context_key)
+        if cached and time.monotonic() - cached[0] < _RESULT_CACHE_TTL:
+            return copy.deepcopy(cached[1])
+        
+        pending = self._pending_analyses.get(context_key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._analyze_comprehensive(context, context_key))
+            self._pending_analyses[context_key] = pending
+            pending.add_done_callback(lambda _: self._pending_analyses.pop(context_key, None))
+        
+        # shield 避免單一呼叫端取消時中斷其他共用同一結果的請求
+        return copy.deepcopy(await asyncio.shield(pending))
+    
+    def _context_key(self, context: AnalysisContext) -> bytes:
+        """以排序鍵的JSON序列化計算上下文的穩定雜湊"""
+        serialized = json.dumps(asdict(context), sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.blake2b(serialized.encode(), digest_size=16).digest()
+    
+    def _cache_result(self, context_key: bytes, strategy: IntegratedStrategy) -> None:
+        """寫入分析結果，超過上限時淘汰最舊的項目"""
+        self._result_cache[context_key] = (time.monotonic(), strategy)
+        self._result_cache.move_to_end(context_key)
+        while len(self._result_cache) > _RESULT_CACHE_MAX_ENTRIES:
+            self._result_cache.popitem(last=False)
+    
+    async def _analyze_comprehensive(self, context: AnalysisContext, context_key: bytes) -> IntegratedStrategy:
+        """執行全面分析，成功的結果寫入緩存；後備策略不緩存以便下次重試"""
+        start_time = time.perf_counter()
         
         try:
-            # Step 1: 並行執行各智能體分析
-            insights = await self._execute_parallel_analysis(context)
+            # Step 1: 並行執行各智能體分析，每完成一個即檢查緊急情況
+            insights, critical_risks = await self._execute_parallel_analysis(context)
             
-            # Step 2: 檢查緊急情況
-            emergency_response = await self._check_emergency_conditions(insights, context)
-            if emergency_response:
+            # Step 2: 檢測到緊急情況時，不等其餘智能體，直接生成緊急響應策略
+            if critical_risks is not None:
+                emergency_response = await self._generate_emergency_strategy(critical_risks, context)
+                self._cache_result(context_key, emergency_response)
                 return emergency_response
             
             # Step 3: 整合策略建議
@@ -294,99 +393,108 @@ class MasterOrchestrator(BaseAgent):
                 integrated_strategy, context
             )
             
-            processing_time = (datetime.now() - start_time).total_seconds()
-            self.logger.info(f"Complete analysis finished in {processing_time:.2f} seconds")
+            processing_time = time.perf_counter() - start_time
+            logger.info("Complete analysis finished in %.2f seconds", processing_time)
             
+            self._cache_result(context_key, validated_strategy)
             return validated_strategy
             
         except Exception as e:
-            self.logger.error(f"Error in comprehensive analysis: {str(e)}")
+            logger.error("Error in comprehensive analysis: %s", e)
             return await self._generate_fallback_strategy(context)
     
-    async def _execute_parallel_analysis(self, context: AnalysisContext) -> Dict[str, AgentInsight]:
-        """並行執行各智能體分析"""
-        tasks = []
-        
-        for agent_name, agent in self.agents.items():
-            task = asyncio.create_task(
-                self._run_agent_analysis(agent_name, agent, context)
-            )
-            tasks.append(task)
-        
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+    async def _execute_parallel_analysis(
+        self, 
+        context: AnalysisContext
+    ) -> Tuple[Dict[str, AgentInsight], Optional[List[str]]]:
+        """
+        並行執行各智能體分析，依完成順序逐一檢查緊急情況
+        
+        達到緊急門檻時取消其餘仍在執行的分析，並返回已收集的洞察與緊急風險；
+        未達門檻時緊急風險為None。
+        """
+        tasks = [
+            asyncio.ensure_future(self._run_named_analysis(agent_name, agent, context))
+            for agent_name, agent in self.agents.items()
+        ]
         
         insights = {}
-        for i, result in enumerate(results):
-            agent_name = list(self.agents.keys())[i]
-            
-            if isinstance(result, Exception):
-                self.logger.error(f"Agent {agent_name} failed: {str(result)}")
-                # 創建默認洞察
-                insights[agent_name] = AgentInsight(
-                    agent_name=agent_name,
-                    recommendations=[],
-                    confidence_score=0.3,
-                    risk_factors=[f"Agent {agent_name} analysis failed"],
-                    opportunities=[],
-                    data_quality_score=0.3,
-                    processing_time=0.0
-                )
-            else:
-                insights[agent_name] = result
+        critical_risks = []
+        high_urgency_count = 0
         
-        return insights
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                agent_name, insight = await next_done
+                insights[agent_name] = insight
+                
+                critical_risks.extend(
+                    risk for risk, lowered in zip(insight.risk_factors, insight.risk_factors_lower)
+                    if _EMERGENCY_PATTERN.search(lowered)
+                )
+                if insight.confidence_score > 0.8 and len(insight.risk_factors) > 3:
+                    high_urgency_count += 1
+                
+                if len(critical_risks) >= 2 or high_urgency_count >= 3:
+                    return insights, critical_risks
+        finally:
+            # 提前返回或外部取消時，不再等待尚未完成的智能體
+            for task in tasks:
+                task.cancel()
+        
+        return insights, None
     
-    async def _run_agent_analysis(
+    async def _run_named_analysis(
         self, 
         agent_name: str, 
         agent: BaseAgent, 
         context: AnalysisContext
-    ) -> AgentInsight:
-        """運行單個智能體分析"""
-        start_time = datetime.now()
-        
+    ) -> Tuple[str, AgentInsight]:
+        """運行單個智能體分析並附上名稱，失敗時返回默認洞察"""
         try:
-            analysis_result = await agent.analyze_context(context)
-            processing_time = (datetime.now() - start_time).total_seconds()
-            
-            return AgentInsight(
-                agent_name=agent_name,
-                recommendations=analysis_result.get('recommendations', []),
-                confidence_score=analysis_result.get('confidence', 0.7),
-                risk_factors=analysis_result.get('risks', []),
-                opportunities=analysis_result.get('opportunities', []),
-                data_quality_score=analysis_result.get('data_quality', 0.8),
-                processing_time=processing_time
-            )
-            
+            return agent_name, await self._run_agent_analysis(agent_name, agent, context)
         except Exception as e:
-            self.logger.error(f"Agent {agent_name} analysis failed: {str(e)}")
-            raise
+            logger.error("Agent %s failed: %s", agent_name, e)
+            return agent_name, self._default_insight(agent_name)
+    
+    def _default_insight(self, agent_name: str) -> AgentInsight:
+        """智能體分析失敗時使用的默認洞察"""
+        return AgentInsight(
+            agent_name=agent_name,
+            recommendations=[],
+            confidence_score=0.3,
+            risk_factors=[f"Agent {agent_name} analysis failed"],
+            opportunities=[],
+            data_quality_score=0.3,
+            processing_time=0.0
+        )
     
-    async def _check_emergency_conditions(
+    async def _run_agent_analysis(
         self, 
-        insights: Dict[str, AgentInsight], 
+        agent_name: str, 
+        agent: BaseAgent, 
         context: AnalysisContext
-    ) -> Optional[IntegratedStrategy]:
-        """檢查是否存在需要緊急處理的情況"""
-        
-        critical_risks = []
-        high_urgency_count = 0
-        
-        for insight in insights.values():
-            for risk in insight.risk_factors:
-                if any(keyword in risk.lower() for keyword in 
-                      ['critical', 'immediate', 'urgent', 'crisis', 'severe']):
-                    critical_risks.append(risk)
+    ) -> AgentInsight:
+        """運行單個智能體分析"""
+        async with self._analysis_semaphore:
+            start_time = time.perf_counter()
             
-            if insight.confidence_score > 0.8 and len(insight.risk_factors) > 3:
-                high_urgency_count += 1
-        
-        # 如果檢測到緊急情況，生成緊急響應策略
-        if len(critical_risks) >= 2 or high_urgency_count >= 3:
-            return await self._generate_emergency_strategy(critical_risks, context)
-        
-        return None
+            try:
+                analysis_result = await agent.analyze_context(context)
+                processing_time = time.perf_counter() - start_time
+                
+                return AgentInsight(
+                    agent_name=agent_name,
+                    recommendations=analysis_result.get('recommendations', []),
+                    confidence_score=analysis_result.get('confidence', 0.7),
+                    risk_factors=analysis_result.get('risks', []),
+                    opportunities=analysis_result.get('opportunities', []),
+                    data_quality_score=analysis_result.get('data_quality', 0.8),
+                    processing_time=processing_time
+                )
+                
+            except Exception as e:
+                logger.error("Agent %s analysis failed: %s", agent_name, e)
+                raise
     
     async def _generate_emergency_strategy(
         self, 
@@ -395,27 +503,24 @@ class MasterOrchestrator(BaseAgent):
     ) -> IntegratedStrategy:
         """生成緊急響應策略"""
         
-        emergency_recommendations = []
-        
-        for i, risk in enumerate(critical_risks[:5]):
-            recommendation = {
+        emergency_titles = [f'Emergency Response: {risk}' for risk in critical_risks[:5]]
+        emergency_recommendations = [
+            {
                 'id': f'emergency_{i}',
-                'title': f'Emergency Response: {risk}',
+                'title': title,
                 'description': f'Immediate action required to address: {risk}',
-                'scope': 'organization',
-                'urgency': 'critical',
-                'weight': 1.0,
-                'type': 'emergency_response'
+                **_EMERGENCY_RECOMMENDATION_BASE
             }
-            emergency_recommendations.append(recommendation)
+            for i, (risk, title) in enumerate(zip(critical_risks, emergency_titles))
+        ]
         
         return IntegratedStrategy(
             individual_recommendations=[],
             team_recommendations=[],
             organizational_recommendations=emergency_recommendations,
             priority_score=1.0,
-            implementation_timeline={'immediate': [rec['title'] for rec in emergency_recommendations]},
-            success_metrics=['Crisis resolution within 48 hours', 'Risk mitigation effectiveness >90%'],
+            implementation_timeline={'immediate': emergency_titles},
+            success_metrics=list(_EMERGENCY_SUCCESS_METRICS),
             risk_mitigation=critical_risks
         )
     
@@ -427,33 +532,30 @@ class MasterOrchestrator(BaseAgent):
         """驗證和優化策略"""
         
         # 檢查資源約束
-        if len(strategy.individual_recommendations + 
-               strategy.team_recommendations + 
-               strategy.organizational_recommendations) > 20:
+        all_recommendations = (
+            strategy.individual_recommendations + 
+            strategy.team_recommendations + 
+            strategy.organizational_recommendations
+        )
+        if len(all_recommendations) > 20:
             
-            # 重新優化，保留最高優先級的建議
-            all_recommendations = (
-                strategy.individual_recommendations + 
-                strategy.team_recommendations + 
-                strategy.organizational_recommendations
+            # 重新優化，只保留權重最高的前7個建議
+            top_recommendations = heapq.nlargest(
+                7, all_recommendations, key=lambda x: x.get('weight', 0.5)
             )
             
-            # 按權重排序並限制數量
-            sorted_recommendations = sorted(
-                all_recommendations, 
-                key=lambda x: x.get('weight', 0.5), 
-                reverse=True
+            strategy = replace(
+                strategy,
+                individual_recommendations=[
+                    rec for rec in top_recommendations if rec.get('scope') == 'individual'
+                ],
+                team_recommendations=[
+                    rec for rec in top_recommendations if rec.get('scope') == 'team'
+                ],
+                organizational_recommendations=[
+                    rec for rec in top_recommendations[:6] if rec.get('scope') == 'organization'
+                ]
             )
-            
-            strategy.individual_recommendations = [
-                rec for rec in sorted_recommendations[:7] if rec.get('scope') == 'individual'
-            ]
-            strategy.team_recommendations = [
-                rec for rec in sorted_recommendations[:7] if rec.get('scope') == 'team'
-            ]
-            strategy.organizational_recommendations = [
-                rec for rec in sorted_recommendations[:6] if rec.get('scope') == 'organization'
-            ]
         
         return strategy
     
@@ -4,12 +4,14 @@
 """
 
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
 import asyncio
 from datetime import datetime
 import random
 
+from core.json_utils import dumps_json
 from agents.gamified_education_agent import (
     GamifiedEducationAgent, 
     DifficultyLevel, 
@@ -76,6 +78,10 @@ class GenerateQuestionRequest(BaseModel):
     topic: str
     difficulty: str = "初級"
 
+class BatchTaskRequest(BaseModel):
+    # 任務格式同 process_task：「指令|參數1|參數2...」，例如「generate_question|勞動法規|初級」
+    tasks: List[str]
+
 class LearningAnalyticsResponse(BaseModel):
     total_users: int
     total_questions_answered: int
@@ -136,7 +142,7 @@ async def start_learning_session(
                 "type": first_question.question_type.value,
                 "exp_reward": first_question.exp_reward
             },
-            total_questions=len(session.questions)
+            total_questions=session.total_questions
         )
         
     except Exception as e:
@@ -177,7 +183,7 @@ async def get_session_status(
             "topic": session.topic,
             "difficulty": session.difficulty.value,
             "current_question": session.current_question_index,
-            "total_questions": len(session.questions),
+            "total_questions": session.total_questions,
             "score": session.score,
             "is_completed": session.is_completed,
             "start_time": session.start_time.isoformat(),
@@ -197,7 +203,7 @@ async def get_user_progress(
 ):
     """獲取用戶學習進度"""
     try:
-        progress = agent.get_user_progress(user_id)
+        progress = await agent.get_user_progress(user_id)
         recommendations = await agent.get_learning_recommendations(user_id)
         
         return UserProgressResponse(
@@ -206,9 +212,9 @@ async def get_user_progress(
             experience=progress.total_experience,
             streak=progress.current_streak,
             best_streak=progress.best_streak,
-            accuracy=progress.correct_answers / max(1, progress.questions_answered),
+            accuracy=progress.accuracy,
             achievements_count=len(progress.achievements),
-            topics_mastered=progress.topics_mastered,
+            topics_mastered=sorted(progress.topics_mastered),
             recommendations=recommendations
         )
         
@@ -222,7 +228,7 @@ async def get_user_achievements(
 ):
     """獲取用戶成就列表"""
     try:
-        progress = agent.get_user_progress(user_id)
+        progress = await agent.get_user_progress(user_id)
         unlocked_achievements = []
         locked_achievements = []
         
@@ -259,10 +265,10 @@ async def get_user_statistics(
 ):
     """獲取用戶詳細統計信息"""
     try:
-        progress = agent.get_user_progress(user_id)
+        progress = await agent.get_user_progress(user_id)
         
         # 計算各種統計指標
-        accuracy = progress.correct_answers / max(1, progress.questions_answered)
+        accuracy = progress.accuracy
         exp_to_next_level = ((progress.current_level) ** 2) * 100 - progress.total_experience
         
         return {
@@ -338,6 +344,56 @@ async def generate_question(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"生成問題失敗: {str(e)}")
 
+@gamification_router.post("/tasks/batch")
+async def process_task_batch(
+    request: BatchTaskRequest,
+    agent: GamifiedEducationAgent = Depends(get_gamification_agent)
+):
+    """批次處理多個獨立的學習任務，結果順序與輸入相同"""
+    if not request.tasks:
+        raise HTTPException(status_code=400, detail="任務列表不可為空")
+    if len(request.tasks) > 50:
+        raise HTTPException(status_code=400, detail="單次最多處理50個任務")
+    
+    results = await agent.process_batch(request.tasks)
+    return {
+        "results": results,
+        "failed": sum(1 for result in results if result.get("metadata", {}).get("error"))
+    }
+
+@gamification_router.get("/questions/stream")
+async def stream_questions(
+    topic: str,
+    difficulty: str = "初級",
+    count: int = 5,
+    agent: GamifiedEducationAgent = Depends(get_gamification_agent)
+):
+    """以Server-Sent Events逐題串流生成學習問題"""
+    difficulty_map = {
+        "初級": DifficultyLevel.BEGINNER,
+        "中級": DifficultyLevel.INTERMEDIATE,
+        "高級": DifficultyLevel.ADVANCED,
+        "專家": DifficultyLevel.EXPERT
+    }
+    difficulty_level = difficulty_map.get(difficulty, DifficultyLevel.BEGINNER)
+    
+    async def event_stream():
+        async for question in agent.stream_questions(topic, difficulty_level, min(max(count, 1), 20)):
+            payload = {
+                "id": question.id,
+                "question": question.question,
+                "options": question.options,
+                "type": question.question_type.value,
+                "difficulty": question.difficulty.value,
+                "topic": question.topic,
+                "exp_reward": question.exp_reward,
+                "preview_mode": True
+            }
+            yield f"data: {dumps_json(payload, indent=False)}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 # 排行榜
 @gamification_router.get("/leaderboard")
 async def get_leaderboard(
@@ -347,18 +403,18 @@ async def get_leaderboard(
     """獲取排行榜"""
     try:
         # 獲取所有用戶進度並排序
-        all_progress = list(agent.user_progress.values())
+        all_progress = await agent.list_user_progress()
         
         # 按經驗值排序
         leaderboard = sorted(
             all_progress,
-            key=lambda x: (x.total_experience, x.correct_answers / max(1, x.questions_answered)),
+            key=lambda x: (x.total_experience, x.accuracy),
             reverse=True
         )[:limit]
         
         leaderboard_data = []
         for i, progress in enumerate(leaderboard):
-            accuracy = progress.correct_answers / max(1, progress.questions_answered)
+            accuracy = progress.accuracy
             
             leaderboard_data.append({
                 "rank": i + 1,
@@ -386,7 +442,7 @@ async def get_learning_analytics(
 ):
     """獲取學習分析數據"""
     try:
-        all_progress = list(agent.user_progress.values())
+        all_progress = await agent.list_user_progress()
         
         total_users = len(all_progress)
         total_questions = sum(p.questions_answered for p in all_progress)
@@ -406,7 +462,7 @@ async def get_learning_analytics(
         recent_achievements = []
         for progress in all_progress:
             if progress.achievements:
-                for achievement_id in progress.achievements[-3:]:  # 最近3個成就
+                for achievement_id in list(progress.achievements)[-3:]:  # 最近3個成就
                     achievement = next((a for a in agent.achievements if a.id == achievement_id), None)
                     if achievement:
                         recent_achievements.append({
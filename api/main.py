@@ -22,11 +22,6 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from agents.master_orchestrator import MasterOrchestrator, AnalysisContext, Priority
-from agents.brain_agent import BrainAgent
-from agents.talent_agent import TalentAgent
-from agents.culture_agent import CultureAgent
-from agents.future_agent import FutureAgent
-from agents.process_agent import ProcessAgent
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -106,14 +101,9 @@ async def startup_event():
         # Initialize Master Orchestrator
         master_orchestrator = MasterOrchestrator()
         
-        # Initialize individual agents
-        individual_agents = {
-            'brain': BrainAgent(),
-            'talent': TalentAgent(),
-            'culture': CultureAgent(),
-            'future': FutureAgent(),
-            'process': ProcessAgent()
-        }
+        # Individual agent endpoints reuse the orchestrator's agent instances
+        # instead of constructing a second copy of every agent and LLM client
+        individual_agents = master_orchestrator.agents
         
         logger.info("All agents initialized successfully")
         
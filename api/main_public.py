@@ -6,12 +6,14 @@ Allows anonymous access for anyone with the link
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import asyncio
+import os
 import uvicorn
 
 from gamified_education_api import gamification_router, initialize_gamification_agent
 from agents.gamified_education_agent import GamifiedEducationAgent
-from agents.rag_agent import RAGKnowledgeAgent
+from agents.rag_knowledge_agent import RAGKnowledgeAgent
 from core.simple_llm import SimpleLLM
+from database.progress_store import SQLiteProgressStore
 
 app = FastAPI(
     title="Public Educational Platform",
@@ -42,7 +44,8 @@ async def startup_event():
         rag_agent = RAGKnowledgeAgent(llm=llm)
         
         # Initialize gamification agent
-        gamification_agent = GamifiedEducationAgent(rag_agent=rag_agent)
+        progress_store = SQLiteProgressStore(os.getenv("PROGRESS_DB_PATH", "progress.db"))
+        gamification_agent = GamifiedEducationAgent(rag_agent=rag_agent, progress_store=progress_store)
         
         # Register the agent globally
         initialize_gamification_agent(gamification_agent)
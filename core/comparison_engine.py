@@ -10,7 +10,43 @@ import asyncio
 from datetime import datetime
 import json
 import numpy as np
+from langchain.output_parsers.openai_functions import JsonOutputFunctionsParser
+from langchain.schema import OutputParserException
+from core.json_utils import dumps_json
 from core.model_manager import MultiModelManager, ModelType
+from agents.llm_pool import invoke_llm
+
+# 類別法規比較的函數呼叫結構，強制模型依此格式回答
+_CATEGORY_COMPARISON_FUNCTION = {
+    "name": "report_category_comparison",
+    "description": "回報各國在特定法規類別的比較結果",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "summary": {"type": "string", "description": "整體比較摘要"},
+            "key_differences": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "aspect": {"type": "string"},
+                        "differences": {
+                            "type": "object",
+                            "additionalProperties": {"type": "string"}
+                        }
+                    },
+                    "required": ["aspect", "differences"]
+                }
+            },
+            "scores": {
+                "type": "object",
+                "description": "國家代碼 -> 1-10分，分數越高表示合規難度越高",
+                "additionalProperties": {"type": "number"}
+            }
+        },
+        "required": ["summary", "key_differences", "scores"]
+    }
+}
 
 class ComparisonEngine:
     """跨國比較引擎 - 用於比較不同國家的法規、稅務和保險數據"""
@@ -21,12 +57,34 @@ class ComparisonEngine:
         self.knowledge_graph = knowledge_graph
         self.model_manager = model_manager
         self.comparison_cache = {}
+        # 進行中的比較：cache_key -> Future，相同參數的並行請求共用同一次執行
+        self._pending_comparisons: Dict[str, asyncio.Future] = {}
         
     async def compare_countries(self, 
                               country_ids: List[str], 
                               domains: Optional[List[str]] = None,
                               focus_areas: Optional[Dict[str, float]] = None) -> CountryComparison:
         """比較多個國家"""
+        # 重複的國家代碼只比較一次
+        country_ids = list(dict.fromkeys(country_ids))
+        cache_key = self._generate_cache_key(country_ids, domains, focus_areas)
+        
+        pending = self._pending_comparisons.get(cache_key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._compare_countries(country_ids, domains, focus_areas))
+            self._pending_comparisons[cache_key] = pending
+            pending.add_done_callback(lambda _: self._pending_comparisons.pop(cache_key, None))
+        else:
+            logger.debug(f"共用進行中的國家比較: {cache_key}")
+        
+        # shield 避免單一呼叫端取消時中斷其他共用同一結果的請求
+        return await asyncio.shield(pending)
+    
+    async def _compare_countries(self, 
+                               country_ids: List[str], 
+                               domains: Optional[List[str]],
+                               focus_areas: Optional[Dict[str, float]]) -> CountryComparison:
+        """執行國家比較並寫入緩存"""
         try:
             # 檢查緩存
             cache_key = self._generate_cache_key(country_ids, domains, focus_areas)
@@ -101,13 +159,7 @@ class ComparisonEngine:
         """比較法規"""
         try:
             # 獲取各國法規
-            country_laws = {}
-            for country_id in country_ids:
-                laws = await self.knowledge_graph.query_entities(
-                    entity_type=EntityType.LAW,
-                    filters={'country_id': country_id}
-                )
-                country_laws[country_id] = laws
+            country_laws = await self._query_country_entities(EntityType.LAW, country_ids)
             
             # 提取關鍵法規類別
             all_categories = set()
@@ -115,12 +167,19 @@ class ComparisonEngine:
                 for law in laws:
                     all_categories.update(law.categories)
             
-            # 按類別比較
+            # 按類別並行比較，個別類別失敗時略過該類別
+            categories = list(all_categories)
+            results = await asyncio.gather(
+                *(self._compare_category_laws(country_laws, category) for category in categories),
+                return_exceptions=True
+            )
+            
             category_comparisons = {}
-            for category in all_categories:
-                category_comparisons[category] = await self._compare_category_laws(
-                    country_laws, category
-                )
+            for category, result in zip(categories, results):
+                if isinstance(result, Exception):
+                    logger.error(f"比較 {category} 類別法規時發生錯誤: {str(result)}")
+                    continue
+                category_comparisons[category] = result
             
             # 計算整體合規難度評分
             compliance_scores = {}
@@ -146,6 +205,17 @@ class ComparisonEngine:
             logger.error(f"比較法規時發生錯誤: {str(e)}")
             return {}
     
+    async def _query_country_entities(self, entity_type: EntityType, country_ids: List[str]) -> Dict[str, List[Any]]:
+        """並行查詢各國指定類型的實體"""
+        results = await asyncio.gather(*(
+            self.knowledge_graph.query_entities(
+                entity_type=entity_type,
+                filters={'country_id': country_id}
+            )
+            for country_id in country_ids
+        ))
+        return dict(zip(country_ids, results))
+    
     async def _compare_category_laws(self, country_laws: Dict[str, List[Any]], category: str) -> Dict[str, Any]:
         """比較特定類別的法規"""
         # 提取各國該類別的法規
@@ -155,41 +225,25 @@ class ComparisonEngine:
                 law for law in laws if category in law.categories
             ]
         
-        # 使用LLM分析比較
+        # 使用LLM分析比較，以函數呼叫取得固定結構的結果
         llm = self.model_manager.get_model(ModelType.GPT4)
+        structured_llm = llm.bind(
+            functions=[_CATEGORY_COMPARISON_FUNCTION],
+            function_call={"name": _CATEGORY_COMPARISON_FUNCTION["name"]}
+        ) | JsonOutputFunctionsParser()
         
         # 構建提示
-        prompt = f"""請比較以下國家在 {category} 類別的勞動法規:
-        
-        {json.dumps(category_laws, ensure_ascii=False, indent=2)}
+        prompt = f"""請比較以下國家在 {category} 類別的勞動法規，並為每個國家評分
+        （1-10分，分數越高表示合規難度越高）:
         
-        請提供以下格式的JSON回答:
-        {{
-            "summary": "整體比較摘要",
-            "key_differences": [
-                {{
-                    "aspect": "方面1",
-                    "differences": {{
-                        "country1": "描述1",
-                        "country2": "描述2"
-                    }}
-                }}
-            ],
-            "scores": {{
-                "country1": 分數1,  // 1-10分，分數越高表示合規難度越高
-                "country2": 分數2
-            }}
-        }}
+        {dumps_json(category_laws)}
         """
         
-        response = await llm.apredict(prompt)
-        
         try:
-            # 解析JSON回答
-            result = json.loads(response)
-            return result
-        except:
-            logger.warning(f"無法解析法規比較結果: {response}")
+            # 與其他LLM呼叫共用並行、每分鐘請求上限與暫時性錯誤重試
+            return await invoke_llm(structured_llm, [{"role": "user", "content": prompt}])
+        except OutputParserException as e:
+            logger.warning(f"無法解析法規比較結果: {str(e)}")
             return {
                 'summary': '無法生成比較摘要',
                 'key_differences': [],
@@ -200,14 +254,12 @@ class ComparisonEngine:
         """比較稅務"""
         try:
             # 獲取各國稅務系統
-            tax_systems = {}
-            for country_id in country_ids:
-                systems = await self.knowledge_graph.query_entities(
-                    entity_type=EntityType.TAX,
-                    filters={'country_id': country_id}
-                )
-                if systems:
-                    tax_systems[country_id] = systems[0]
+            country_systems = await self._query_country_entities(EntityType.TAX, country_ids)
+            tax_systems = {
+                country_id: systems[0]
+                for country_id, systems in country_systems.items()
+                if systems
+            }
             
             # 比較所得稅率
             income_tax_comparison = {}
@@ -248,14 +300,12 @@ class ComparisonEngine:
         """比較保險"""
         try:
             # 獲取各國保險系統
-            insurance_systems = {}
-            for country_id in country_ids:
-                systems = await self.knowledge_graph.query_entities(
-                    entity_type=EntityType.INSURANCE,
-                    filters={'country_id': country_id}
-                )
-                if systems:
-                    insurance_systems[country_id] = systems[0]
+            country_systems = await self._query_country_entities(EntityType.INSURANCE, country_ids)
+            insurance_systems = {
+                country_id: systems[0]
+                for country_id, systems in country_systems.items()
+                if systems
+            }
             
             # 比較強制保險
             mandatory_comparison = {}
@@ -293,13 +343,7 @@ class ComparisonEngine:
         """比較成本"""
         try:
             # 獲取各國成本
-            country_costs = {}
-            for country_id in country_ids:
-                costs = await self.knowledge_graph.query_entities(
-                    entity_type=EntityType.COST,
-                    filters={'country_id': country_id}
-                )
-                country_costs[country_id] = costs
+            country_costs = await self._query_country_entities(EntityType.COST, country_ids)
             
             # 按成本類型分組
             cost_types = {}
@@ -334,13 +378,7 @@ class ComparisonEngine:
         """比較風險"""
         try:
             # 獲取各國風險
-            country_risks = {}
-            for country_id in country_ids:
-                risks = await self.knowledge_graph.query_entities(
-                    entity_type=EntityType.RISK,
-                    filters={'country_id': country_id}
-                )
-                country_risks[country_id] = risks
+            country_risks = await self._query_country_entities(EntityType.RISK, country_ids)
             
             # 按風險類型分組
             risk_types = {}
@@ -387,22 +425,22 @@ class ComparisonEngine:
             比較國家: {', '.join(comparison.countries)}
             
             法規比較:
-            {json.dumps(comparison.legal_comparison, ensure_ascii=False, indent=2)}
+            {dumps_json(comparison.legal_comparison)}
             
             稅務比較:
-            {json.dumps(comparison.tax_comparison, ensure_ascii=False, indent=2)}
+            {dumps_json(comparison.tax_comparison)}
             
             保險比較:
-            {json.dumps(comparison.insurance_comparison, ensure_ascii=False, indent=2)}
+            {dumps_json(comparison.insurance_comparison)}
             
             成本比較:
-            {json.dumps(comparison.cost_comparison, ensure_ascii=False, indent=2)}
+            {dumps_json(comparison.cost_comparison)}
             
             風險比較:
-            {json.dumps(comparison.risk_comparison, ensure_ascii=False, indent=2)}
+            {dumps_json(comparison.risk_comparison)}
             
             重點領域權重:
-            {json.dumps(focus_areas, ensure_ascii=False, indent=2)}
+            {dumps_json(focus_areas)}
             
             請提供全面的建議，包括:
             1. 各國優缺點分析
@@ -411,7 +449,7 @@ class ComparisonEngine:
             4. 具體實施建議
             """
             
-            recommendation = await llm.apredict(prompt)
+            recommendation = (await invoke_llm(llm, [{"role": "user", "content": prompt}])).content
             return recommendation
             
         except Exception as e:
@@ -4,6 +4,7 @@ from langchain.prompts import ChatPromptTemplate
 from langchain.chains import LLMChain
 from .model_context_protocol import MCPManager, ModelContext
 from .rag_engine import RAGEngine
+from agents.llm_pool import invoke_llm
 import asyncio
 from loguru import logger
 
@@ -41,18 +42,18 @@ class ContextAwareGenerator:
             )
             
             # 生成回應
-            response = await self.llm.agenerate([prompt])
+            response = await invoke_llm(self.llm, [{"role": "user", "content": prompt}])
             
             # 更新上下文歷史
             self._update_context_history(
                 context_type,
                 query,
-                response.generations[0][0].text,
+                response.content,
                 rag_result
             )
             
             return {
-                'response': response.generations[0][0].text,
+                'response': response.content,
                 'context_used': {
                     'rag_context': rag_result['context_summary'],
                     'history_length': len(history_context),
@@ -0,0 +1,33 @@
+"""
+JSON Utilities
+JSON工具 - 提示詞組裝與LLM輸出解析共用的JSON編解碼，安裝orjson時使用其加速
+"""
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps_json(data: Any, indent: bool = True) -> str:
+    """序列化為保留中文字元的JSON字串；預設縮排兩格，indent=False 時輸出單行（如 SSE 的 data 欄位）"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(data, option=option).decode()
+        except TypeError:
+            # orjson 不支援 int/float 子類別（如 IntEnum）等型別，改用標準庫序列化
+            pass
+    return json.dumps(data, ensure_ascii=False, indent=2 if indent else None)
+
+
+def loads_json(content: Union[str, bytes]) -> Any:
+    """解析JSON字串；orjson.JSONDecodeError 繼承自 json.JSONDecodeError，呼叫端的例外處理不需調整"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
@@ -3,7 +3,7 @@ Query Analyzer - 查詢分析器
 自動判斷問題複雜度，動態調整檢索策略
 """
 
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Pattern, Tuple
 from dataclasses import dataclass
 from enum import Enum
 import re
@@ -44,6 +44,16 @@ class QueryAnalyzer:
         
         # HR領域關鍵詞庫
         self.hr_keywords = self._init_hr_keywords()
+        
+        # 預先編譯規則與各主題的關鍵詞正則，分析時不再逐一比對
+        self._compiled_rules = {
+            level: [re.compile(pattern) for pattern in patterns]
+            for level, patterns in self.complexity_rules.items()
+        }
+        self._topic_patterns = {
+            topic: re.compile("|".join(map(re.escape, topic_keywords)))
+            for topic, topic_keywords in self.hr_keywords.items()
+        }
     
     def _init_complexity_rules(self) -> Dict[str, Any]:
         """初始化複雜度判斷規則"""
@@ -174,28 +184,23 @@ class QueryAnalyzer:
     
     def _identify_topics(self, query: str, keywords: List[str]) -> List[str]:
         """識別HR主題領域"""
-        topics = []
-        
-        for topic, topic_keywords in self.hr_keywords.items():
-            for keyword in keywords:
-                if any(kw in keyword for kw in topic_keywords):
-                    topics.append(topic)
-                    break
-        
-        return list(set(topics))
+        return [
+            topic for topic, pattern in self._topic_patterns.items()
+            if any(pattern.search(keyword) for keyword in keywords)
+        ]
     
     def _determine_complexity(self, query: str, keywords: List[str], topics: List[str]) -> Tuple[QueryComplexity, str]:
         """判斷查詢複雜度"""
         reasons = []
         
         # 檢查專家級指標
-        expert_matches = self._check_pattern_matches(query, self.complexity_rules["expert_indicators"])
+        expert_matches = self._check_pattern_matches(query, self._compiled_rules["expert_indicators"])
         if expert_matches:
             reasons.append(f"包含專家級關鍵詞: {expert_matches}")
             return QueryComplexity.EXPERT, "; ".join(reasons)
         
         # 檢查複雜級指標
-        complex_matches = self._check_pattern_matches(query, self.complexity_rules["complex_indicators"])
+        complex_matches = self._check_pattern_matches(query, self._compiled_rules["complex_indicators"])
         if complex_matches or len(topics) >= 3:
             if complex_matches:
                 reasons.append(f"包含複雜級關鍵詞: {complex_matches}")
@@ -204,7 +209,7 @@ class QueryAnalyzer:
             return QueryComplexity.COMPLEX, "; ".join(reasons)
         
         # 檢查中等級指標
-        moderate_matches = self._check_pattern_matches(query, self.complexity_rules["moderate_indicators"])
+        moderate_matches = self._check_pattern_matches(query, self._compiled_rules["moderate_indicators"])
         if moderate_matches or len(keywords) >= 5 or len(topics) == 2:
             if moderate_matches:
                 reasons.append(f"包含中等級關鍵詞: {moderate_matches}")
@@ -215,7 +220,7 @@ class QueryAnalyzer:
             return QueryComplexity.MODERATE, "; ".join(reasons)
         
         # 檢查簡單級指標
-        simple_matches = self._check_pattern_matches(query, self.complexity_rules["simple_indicators"])
+        simple_matches = self._check_pattern_matches(query, self._compiled_rules["simple_indicators"])
         if simple_matches or len(keywords) <= 3:
             if simple_matches:
                 reasons.append(f"包含簡單級關鍵詞: {simple_matches}")
@@ -227,13 +232,9 @@ class QueryAnalyzer:
         reasons.append("預設中等複雜度")
         return QueryComplexity.MODERATE, "; ".join(reasons)
     
-    def _check_pattern_matches(self, query: str, patterns: List[str]) -> List[str]:
-        """檢查模式匹配"""
-        matches = []
-        for pattern in patterns:
-            if re.search(pattern, query):
-                matches.append(pattern)
-        return matches
+    def _check_pattern_matches(self, query: str, patterns: List[Pattern[str]]) -> List[str]:
+        """檢查模式匹配，返回命中的規則字串"""
+        return [pattern.pattern for pattern in patterns if pattern.search(query)]
     
     def _get_suggested_chunks(self, complexity: QueryComplexity) -> int:
         """根據複雜度建議片段數量"""
@@ -7,6 +7,7 @@ from langchain.vectorstores import Chroma
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
 from .model_context_protocol import MCPManager
+from agents.llm_pool import invoke_llm
 import asyncio
 from loguru import logger
 
@@ -101,7 +102,7 @@ class RAGEngine:
             prompt = self._prepare_generation_prompt(query, context)
             
             # 生成回答
-            response = await self.llm.agenerate([prompt])
+            response = await invoke_llm(self.llm, [{"role": "user", "content": prompt}])
             
             # 提取相關來源
             sources = [
@@ -114,7 +115,7 @@ class RAGEngine:
             ]
             
             return {
-                'answer': response.generations[0][0].text,
+                'answer': response.content,
                 'sources': sources,
                 'context_summary': await self.mcp_manager.get_context_summary(
                     f"{context_type}_{hash(query)}"
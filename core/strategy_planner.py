@@ -12,7 +12,9 @@ import asyncio
 from datetime import datetime
 import json
 import uuid
+from core.json_utils import dumps_json, loads_json
 from core.model_manager import MultiModelManager, ModelType
+from agents.llm_pool import invoke_llm
 
 class StrategyPlanner:
     """聘用策略規劃器 - 用於生成跨國聘用策略"""
@@ -151,19 +153,19 @@ class StrategyPlanner:
             prompt = f"""基於以下信息，為每個國家選擇最佳聘用模式:
             
             公司需求:
-            {json.dumps(requirements, ensure_ascii=False, indent=2)}
+            {dumps_json(requirements)}
             
             國家比較:
-            {json.dumps({
+            {dumps_json({
                 'legal_comparison': comparison.legal_comparison,
                 'tax_comparison': comparison.tax_comparison,
                 'insurance_comparison': comparison.insurance_comparison,
                 'cost_comparison': comparison.cost_comparison,
                 'risk_comparison': comparison.risk_comparison
-            }, ensure_ascii=False, indent=2)}
+            })}
             
             可用聘用模式:
-            {json.dumps({
+            {dumps_json({
                 country_id: [
                     {
                         'name': model.name,
@@ -173,7 +175,7 @@ class StrategyPlanner:
                     for model in models
                 ]
                 for country_id, models in employment_models.items()
-            }, ensure_ascii=False, indent=2)}
+            })}
             
             請為每個國家選擇最佳聘用模式，並提供選擇理由。返回以下格式的JSON:
             {{
@@ -188,11 +190,11 @@ class StrategyPlanner:
             }}
             """
             
-            response = await llm.apredict(prompt)
+            response = (await invoke_llm(llm, [{"role": "user", "content": prompt}])).content
             
             try:
                 # 解析JSON回答
-                result = json.loads(response)
+                result = loads_json(response)
                 
                 # 提取模式名稱
                 recommended_models = {
@@ -232,10 +234,10 @@ class StrategyPlanner:
             prompt = f"""基於以下信息，估算每個國家的聘用成本:
             
             公司需求:
-            {json.dumps(requirements, ensure_ascii=False, indent=2)}
+            {dumps_json(requirements)}
             
             推薦聘用模式:
-            {json.dumps(recommended_models, ensure_ascii=False, indent=2)}
+            {dumps_json(recommended_models)}
             
             請估算每個國家的年度聘用成本（美元），考慮以下因素:
             1. 薪資成本
@@ -251,11 +253,11 @@ class StrategyPlanner:
             }}
             """
             
-            response = await llm.apredict(prompt)
+            response = (await invoke_llm(llm, [{"role": "user", "content": prompt}])).content
             
             try:
                 # 解析JSON回答
-                result = json.loads(response)
+                result = loads_json(response)
                 return result
                 
             except:
@@ -281,14 +283,14 @@ class StrategyPlanner:
             prompt = f"""基於以下信息，評估每個國家的聘用風險:
             
             推薦聘用模式:
-            {json.dumps(recommended_models, ensure_ascii=False, indent=2)}
+            {dumps_json(recommended_models)}
             
             國家比較:
-            {json.dumps({
+            {dumps_json({
                 'legal_comparison': comparison.legal_comparison,
                 'tax_comparison': comparison.tax_comparison,
                 'risk_comparison': comparison.risk_comparison
-            }, ensure_ascii=False, indent=2)}
+            })}
             
             請評估每個國家的主要風險，包括:
             1. 法規風險
@@ -327,11 +329,11 @@ class StrategyPlanner:
             }}
             """
             
-            response = await llm.apredict(prompt)
+            response = (await invoke_llm(llm, [{"role": "user", "content": prompt}])).content
             
             try:
                 # 解析JSON回答
-                result = json.loads(response)
+                result = loads_json(response)
                 return result
                 
             except:
@@ -392,13 +394,13 @@ class StrategyPlanner:
             prompt = f"""基於以下信息，生成跨國聘用策略的實施步驟:
             
             公司需求:
-            {json.dumps(requirements, ensure_ascii=False, indent=2)}
+            {dumps_json(requirements)}
             
             目標國家:
-            {json.dumps(country_ids, ensure_ascii=False, indent=2)}
+            {dumps_json(country_ids)}
             
             推薦聘用模式:
-            {json.dumps(recommended_models, ensure_ascii=False, indent=2)}
+            {dumps_json(recommended_models)}
             
             請生成詳細的實施步驟，包括:
             1. 準備階段
@@ -433,11 +435,11 @@ class StrategyPlanner:
             ]
             """
             
-            response = await llm.apredict(prompt)
+            response = (await invoke_llm(llm, [{"role": "user", "content": prompt}])).content
             
             try:
                 # 解析JSON回答
-                result = json.loads(response)
+                result = loads_json(response)
                 return result
                 
             except:
@@ -0,0 +1,117 @@
+"""
+Learning Progress Store Implementation
+學習進度存儲實現 - 以SQLite持久化遊戲化學習進度
+"""
+
+import sqlite3
+import json
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+
+class SQLiteProgressStore:
+    """SQLite學習進度存儲"""
+
+    def __init__(self, db_path: str = "progress.db"):
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+
+        # autocommit 模式；API 以多執行緒存取同一連線，由鎖保護
+        self.connection = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self._create_schema()
+
+    def _create_schema(self):
+        """建立資料表"""
+        with self._lock:
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS user_progress (
+                    user_id TEXT PRIMARY KEY,
+                    total_experience INTEGER NOT NULL DEFAULT 0,
+                    current_level INTEGER NOT NULL DEFAULT 1,
+                    current_streak INTEGER NOT NULL DEFAULT 0,
+                    best_streak INTEGER NOT NULL DEFAULT 0,
+                    questions_answered INTEGER NOT NULL DEFAULT 0,
+                    correct_answers INTEGER NOT NULL DEFAULT 0,
+                    last_activity TEXT NOT NULL,
+                    achievements TEXT NOT NULL DEFAULT '[]',
+                    topics_mastered TEXT NOT NULL DEFAULT '[]'
+                )
+            """)
+
+    def _row_to_record(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """將資料列轉換為進度記錄"""
+        record = dict(row)
+        record['achievements'] = json.loads(record['achievements'])
+        record['topics_mastered'] = json.loads(record['topics_mastered'])
+        return record
+
+    def load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """讀取單一用戶的進度記錄"""
+        try:
+            with self._lock:
+                row = self.connection.execute(
+                    "SELECT * FROM user_progress WHERE user_id = ?", (user_id,)
+                ).fetchone()
+            return self._row_to_record(row) if row else None
+
+        except Exception as e:
+            self.logger.error(f"Error loading progress for {user_id}: {str(e)}")
+            return None
+
+    def load_all(self) -> List[Dict[str, Any]]:
+        """讀取所有用戶的進度記錄"""
+        try:
+            with self._lock:
+                rows = self.connection.execute("SELECT * FROM user_progress").fetchall()
+            return [self._row_to_record(row) for row in rows]
+
+        except Exception as e:
+            self.logger.error(f"Error loading all progress records: {str(e)}")
+            return []
+
+    def save(self, record: Dict[str, Any]) -> bool:
+        """寫入或更新用戶的進度記錄"""
+        try:
+            with self._lock:
+                self.connection.execute(
+                    """
+                    INSERT INTO user_progress (
+                        user_id, total_experience, current_level, current_streak, best_streak,
+                        questions_answered, correct_answers, last_activity, achievements, topics_mastered
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(user_id) DO UPDATE SET
+                        total_experience = excluded.total_experience,
+                        current_level = excluded.current_level,
+                        current_streak = excluded.current_streak,
+                        best_streak = excluded.best_streak,
+                        questions_answered = excluded.questions_answered,
+                        correct_answers = excluded.correct_answers,
+                        last_activity = excluded.last_activity,
+                        achievements = excluded.achievements,
+                        topics_mastered = excluded.topics_mastered
+                    """,
+                    (
+                        record['user_id'],
+                        record['total_experience'],
+                        record['current_level'],
+                        record['current_streak'],
+                        record['best_streak'],
+                        record['questions_answered'],
+                        record['correct_answers'],
+                        record['last_activity'],
+                        json.dumps(record['achievements'], ensure_ascii=False),
+                        json.dumps(record['topics_mastered'], ensure_ascii=False)
+                    )
+                )
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Error saving progress for {record.get('user_id')}: {str(e)}")
+            return False
+
+    def close(self):
+        """關閉資料庫連線"""
+        with self._lock:
+            self.connection.close()
@@ -3,6 +3,7 @@ Vector Database Implementation for AI Talent Ecosystem
 向量數據庫實現 - 用於語義搜索和相似性匹配
 """
 
+import asyncio
 import chromadb
 from chromadb.config import Settings
 from typing import List, Dict, Any, Optional, Tuple
@@ -13,6 +14,32 @@ import json
 from datetime import datetime
 
 
+def _mmr_select(query_embedding: np.ndarray, candidates: np.ndarray,
+                top_k: int, lambda_mult: float = 0.5) -> List[int]:
+    """
+    最大邊際相關性（MMR）選擇
+
+    候選向量只正規化一次，與查詢的相似度以單次矩陣乘法算出；
+    與已選集合的最大相似度以向量逐步更新，不重算兩兩相似度。
+    """
+    candidates = candidates / np.maximum(np.linalg.norm(candidates, axis=1, keepdims=True), 1e-12)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+    
+    relevance = candidates @ query
+    selected = [int(np.argmax(relevance))]
+    max_similarity = candidates @ candidates[selected[0]]
+    
+    while len(selected) < min(top_k, len(candidates)):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        np.maximum(max_similarity, candidates @ candidates[best], out=max_similarity)
+    
+    return selected
+
+
 class ChromaVectorStore:
     """ChromaDB向量存儲實現"""
     
@@ -91,15 +118,8 @@ class ChromaVectorStore:
             # 構建查詢文本
             query_text = self._build_employee_text(query_profile)
             
-            # 生成查詢嵌入
-            query_embedding = self.embedding_model.encode(query_text).tolist()
-            
-            # 執行相似性搜索
-            results = self.collections['employees'].query(
-                query_embeddings=[query_embedding],
-                n_results=top_k,
-                include=['documents', 'metadatas', 'distances']
-            )
+            # 生成查詢嵌入並執行相似性搜索
+            results = await asyncio.to_thread(self._query_collection, 'employees', query_text, top_k)
             
             # 格式化結果
             similar_employees = []
@@ -147,13 +167,7 @@ class ChromaVectorStore:
     async def search_related_skills(self, skill_query: str, top_k: int = 10) -> List[Dict[str, Any]]:
         """搜索相關技能"""
         try:
-            query_embedding = self.embedding_model.encode(skill_query).tolist()
-            
-            results = self.collections['skills'].query(
-                query_embeddings=[query_embedding],
-                n_results=top_k,
-                include=['documents', 'metadatas', 'distances']
-            )
+            results = await asyncio.to_thread(self._query_collection, 'skills', skill_query, top_k)
             
             related_skills = []
             if results['ids'][0]:
@@ -171,26 +185,22 @@ class ChromaVectorStore:
             self.logger.error(f"Error searching related skills: {str(e)}")
             return []
     
-    async def search_laws(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
-        """搜索相關法規（為LegalAdvisorAgent提供）"""
+    async def search_laws(self, query: str, top_k: int = 5,
+                          fetch_k: int = 20, lambda_mult: float = 0.5) -> List[Dict[str, Any]]:
+        """搜索相關法規（為LegalAdvisorAgent提供），以MMR兼顧相關性與多樣性"""
         try:
-            query_embedding = self.embedding_model.encode(query).tolist()
-            
-            results = self.collections['policies'].query(
-                query_embeddings=[query_embedding],
-                n_results=top_k,
-                include=['documents', 'metadatas', 'distances']
+            results, selected = await asyncio.to_thread(
+                self._search_laws_mmr, query, top_k, max(fetch_k, top_k), lambda_mult
             )
             
             relevant_laws = []
-            if results['ids'][0]:
-                for i, policy_id in enumerate(results['ids'][0]):
-                    relevant_laws.append({
-                        'policy_id': policy_id,
-                        'relevance_score': 1 - results['distances'][0][i],
-                        'content': results['documents'][0][i],
-                        'metadata': results['metadatas'][0][i]
-                    })
+            for i in selected:
+                relevant_laws.append({
+                    'policy_id': results['ids'][0][i],
+                    'relevance_score': 1 - results['distances'][0][i],
+                    'content': results['documents'][0][i],
+                    'metadata': results['metadatas'][0][i]
+                })
             
             return relevant_laws
             
@@ -198,6 +208,33 @@ class ChromaVectorStore:
             self.logger.error(f"Error searching laws: {str(e)}")
             return []
     
+    def _search_laws_mmr(self, query: str, top_k: int, fetch_k: int,
+                         lambda_mult: float) -> Tuple[Dict[str, Any], List[int]]:
+        """取回 fetch_k 個候選法規後以MMR選出 top_k 個索引"""
+        query_embedding = self.embedding_model.encode(query)
+        
+        results = self.collections['policies'].query(
+            query_embeddings=[query_embedding.tolist()],
+            n_results=fetch_k,
+            include=['documents', 'metadatas', 'distances', 'embeddings']
+        )
+        
+        if not results['ids'][0]:
+            return results, []
+        
+        candidates = np.asarray(results['embeddings'][0], dtype=np.float32)
+        return results, _mmr_select(query_embedding, candidates, top_k, lambda_mult)
+    
+    def _query_collection(self, collection_name: str, query_text: str, top_k: int) -> Dict[str, Any]:
+        """生成查詢嵌入並搜索集合（同步且耗CPU，由呼叫端移至執行緒執行）"""
+        query_embedding = self.embedding_model.encode(query_text).tolist()
+        
+        return self.collections[collection_name].query(
+            query_embeddings=[query_embedding],
+            n_results=top_k,
+            include=['documents', 'metadatas', 'distances']
+        )
+    
     def _build_employee_text(self, profile_data: Dict[str, Any]) -> str:
         """構建員工檔案的文本表示"""
         parts = []
@@ -0,0 +1,294 @@
+"""
+Unit Tests for Gamified Education Agent
+遊戲化教學 Agent 單元測試
+"""
+
+import asyncio
+import itertools
+import json
+import pytest
+from collections import OrderedDict, defaultdict
+from unittest.mock import AsyncMock, Mock, patch
+
+from agents.gamified_education_agent import (
+    GamifiedEducationAgent, LearningProgress, LearningQuestion, LearningSession, DifficultyLevel, QuestionType
+)
+from database.progress_store import SQLiteProgressStore
+
+
+@pytest.mark.unit
+@pytest.mark.agent
+class TestGamifiedEducationAgent:
+    """遊戲化教學Agent測試類"""
+    
+    @pytest.fixture
+    def agent(self):
+        """創建不連接LLM的Agent，僅用於測試純計算邏輯"""
+        return GamifiedEducationAgent.__new__(GamifiedEducationAgent)
+    
+    @pytest.mark.parametrize("experience,expected_level", [
+        (0, 1),
+        (99, 1),
+        (100, 2),
+        (399, 2),
+        (400, 3),
+        (899, 3),
+        (900, 4),
+    ])
+    def test_check_level_up_boundaries(self, agent, experience, expected_level):
+        """測試等級公式在經驗值邊界上的結果"""
+        progress = LearningProgress(user_id="user_001", total_experience=experience)
+        
+        agent._check_level_up(progress)
+        
+        assert progress.current_level == expected_level
+    
+    def test_check_level_up_reports_level_change(self, agent):
+        """測試升級時返回新舊等級"""
+        progress = LearningProgress(user_id="user_001", total_experience=400)
+        
+        result = agent._check_level_up(progress)
+        
+        assert result["old_level"] == 1
+        assert result["new_level"] == 3
+        assert agent._check_level_up(progress) is None
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("correct_answer,user_answer,expected", [
+        ("勞動基準法", "勞動基準法", True),
+        ("勞動基準法", "  勞動基準法。", True),
+        ("勞動基準法", "勞動基準法施行細則", False),
+        ("勞動基準法", "性別平等工作法", False),
+        ("ESG", "ｅｓｇ", True),
+        ("1.5倍", "1.5倍。", True),
+        ("1.5倍", "15倍", False),
+        ("12.5%", "125%", False),
+        ("30,000元", "30,000元", True),
+        ("30,000元", "30000元", True),
+        ("30,000元", "3,000元", False),
+    ])
+    async def test_evaluate_fill_blank_without_llm(self, agent, correct_answer, user_answer, expected):
+        """測試填空題以正規化比對評分，不呼叫LLM"""
+        question = LearningQuestion(
+            id="q_1",
+            question="台灣規範勞動條件最低標準的法律是____",
+            options=[],
+            correct_answer=correct_answer,
+            explanation="",
+            topic="勞動法規",
+            difficulty=DifficultyLevel.INTERMEDIATE,
+            question_type=QuestionType.FILL_BLANK,
+            source_context="",
+            exp_reward=26
+        )
+        
+        assert await agent._evaluate_answer(question, user_answer) is expected
+    
+    @pytest.mark.parametrize("question_data", [
+        ["不是物件"],
+        {"question": "問題", "correct_answer": "答案"},
+        {"question": "問題", "correct_answer": True, "explanation": "解釋"},
+        {"question": "問題", "correct_answer": "A", "explanation": "解釋", "options": "A,B,C,D"},
+    ])
+    def test_build_question_rejects_invalid_payload(self, agent, question_data):
+        """測試格式不符的問題物件返回None，交由備用問題處理"""
+        question = agent._build_question(
+            question_data, "勞動法規", "", QuestionType.MULTIPLE_CHOICE, DifficultyLevel.BEGINNER
+        )
+        
+        assert question is None
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("llm_output,expected", [
+        ('["答案正確"]', (True, None)),
+        ('[true]', (False, None)),
+        ('"不正確"', (False, None)),
+        ('{"is_correct": true, "learning_tip": " 延伸閱讀 "}', (True, "延伸閱讀")),
+    ])
+    async def test_evaluate_open_answer_handles_non_object_json(self, agent, llm_output, expected):
+        """測試LLM返回非物件JSON時改以文字判斷，不拋出例外"""
+        agent.llm = Mock()
+        question = LearningQuestion(
+            id="q_2",
+            question="請說明加班費的計算方式",
+            options=[],
+            correct_answer="依勞基法第24條計算",
+            explanation="",
+            topic="勞動法規",
+            difficulty=DifficultyLevel.ADVANCED,
+            question_type=QuestionType.SHORT_ANSWER,
+            source_context="",
+            exp_reward=40
+        )
+        
+        with patch("agents.gamified_education_agent.invoke_llm", AsyncMock(return_value=Mock(content=llm_output))):
+            result = await agent._evaluate_open_answer(question, "依勞基法計算")
+        
+        assert result == expected
+
+    
+    @pytest.mark.asyncio
+    async def test_progress_persists_through_store(self, agent, tmp_path):
+        """測試進度經由存儲寫入後，新的Agent實例可讀回"""
+        store = SQLiteProgressStore(str(tmp_path / "progress.db"))
+        agent.progress_store = store
+        agent.user_progress = OrderedDict()
+        agent._progress_cache_size = 10_000
+        
+        progress = await agent.get_user_progress("user_001")
+        progress.total_experience = 150
+        await agent._save_user_progress(progress)
+        
+        agent.user_progress.clear()
+        reloaded = await agent.get_user_progress("user_001")
+        
+        assert reloaded.total_experience == 150
+        assert [p.user_id for p in await agent.list_user_progress()] == ["user_001"]
+        store.close()
+    
+    @pytest.mark.asyncio
+    async def test_process_batch_keeps_order_and_isolates_failures(self, agent):
+        """測試批次處理保持輸入順序，單一任務失敗只影響自身結果"""
+        async def process_task(task):
+            if task == "壞任務":
+                raise ValueError("無法處理")
+            return {"content": task}
+        
+        agent.process_task = process_task
+        progress = []
+        
+        results = await agent.process_batch(
+            ["任務一", "壞任務", "任務三"],
+            on_progress=lambda index, result: progress.append(index)
+        )
+        
+        assert results[0] == {"content": "任務一"}
+        assert results[1]["metadata"] == {"error": True}
+        assert results[2] == {"content": "任務三"}
+        assert sorted(progress) == [0, 1, 2]
+    
+    @pytest.fixture
+    def pooled_agent(self, agent):
+        """以假的問題串流取代LLM，並記錄每次串流請求的題數"""
+        agent._question_pool = OrderedDict()
+        agent._pool_fillers = {}
+        agent._pool_max_keys = 2
+        agent._pool_low_watermark = 4
+        agent._pool_batch_size = 8
+        agent.stream_requests = []
+        
+        async def stream_questions(topic, difficulty, count):
+            agent.stream_requests.append(count)
+            for i in range(count):
+                yield f"{topic}-{i}"
+        
+        agent.stream_questions = stream_questions
+        return agent
+    
+    @pytest.mark.asyncio
+    async def test_first_request_generates_only_requested_questions(self, pooled_agent):
+        """測試首次請求的主題只即時生成所需題數，不觸發背景批次"""
+        questions = await pooled_agent._take_pooled_questions("勞動法規", DifficultyLevel.BEGINNER, 2)
+        await asyncio.sleep(0)
+        
+        assert questions == ["勞動法規-0", "勞動法規-1"]
+        assert pooled_agent.stream_requests == [2]
+        assert pooled_agent._pool_fillers == {}
+    
+    @pytest.mark.asyncio
+    async def test_repeat_request_seeds_pool_from_same_generation(self, pooled_agent):
+        """測試問題池不足時以同一次生成補充問題池，完成後移除補充任務"""
+        key = ("勞動法規", DifficultyLevel.BEGINNER)
+        await pooled_agent._take_pooled_questions(*key, 1)
+        
+        questions = await pooled_agent._take_pooled_questions(*key, 2)
+        await pooled_agent._pool_fillers[key]
+        
+        assert questions == ["勞動法規-0", "勞動法規-1"]
+        assert pooled_agent.stream_requests == [1, 10]
+        assert pooled_agent._question_pool[key].qsize() == 8
+        assert key not in pooled_agent._pool_fillers
+        
+        # 問題池足夠時直接取用，不再呼叫LLM
+        assert await pooled_agent._take_pooled_questions(*key, 2) == ["勞動法規-2", "勞動法規-3"]
+        assert pooled_agent.stream_requests == [1, 10]
+    
+    @pytest.mark.asyncio
+    async def test_question_pool_evicts_least_recently_used_topic(self, pooled_agent):
+        """測試問題池數量超過上限時淘汰最久未使用的主題"""
+        for topic in ["勞動法規", "薪資管理", "員工關係"]:
+            await pooled_agent._take_pooled_questions(topic, DifficultyLevel.BEGINNER, 1)
+        
+        assert list(pooled_agent._question_pool) == [
+            ("薪資管理", DifficultyLevel.BEGINNER),
+            ("員工關係", DifficultyLevel.BEGINNER),
+        ]
+    
+    @pytest.mark.asyncio
+    async def test_stream_questions_releases_llm_slot_before_consumer_finishes(self, agent):
+        """測試串流生成讀完LLM輸出即釋放共用額度，不因下游消費緩慢而佔住名額"""
+        agent._id_counter = itertools.count()
+        agent.system_message = {"role": "system", "content": ""}
+        agent._query_topic_knowledge = AsyncMock(return_value=Mock(answer="勞基法", source_documents=[]))
+        payload = json.dumps([
+            {"question": f"問題{i}", "options": [], "correct_answer": "答案", "explanation": "說明"}
+            for i in range(2)
+        ], ensure_ascii=False)
+        
+        async def astream(messages):
+            yield Mock(content=payload)
+        
+        agent.llm = Mock(astream=astream)
+        slot_holders = []
+        
+        class FakeSlot:
+            async def __aenter__(self):
+                slot_holders.append(True)
+            
+            async def __aexit__(self, *exc_info):
+                slot_holders.pop()
+        
+        with patch("agents.gamified_education_agent.llm_slot", FakeSlot):
+            stream = agent.stream_questions("勞動法規", DifficultyLevel.ADVANCED, 2)
+            first = await stream.__anext__()
+            # 消費端暫停時，生產任務應已讀完輸出並釋放額度
+            await asyncio.sleep(0)
+            assert slot_holders == []
+            rest = [question async for question in stream]
+        
+        assert [q.question for q in [first, *rest]] == ["問題0", "問題1"]
+    
+    @pytest.mark.asyncio
+    async def test_submit_answer_cancels_feedback_when_progress_update_fails(self, agent):
+        """測試進度更新失敗時取消已發出的反饋任務，不留下未處理的任務"""
+        question = LearningQuestion(
+            id="q_3",
+            question="加班費如何計算？",
+            options=[],
+            correct_answer="1.34倍",
+            explanation="",
+            topic="勞動法規",
+            difficulty=DifficultyLevel.BEGINNER,
+            question_type=QuestionType.FILL_BLANK,
+            source_context="",
+            exp_reward=10
+        )
+        session = LearningSession("s_1", "user_001", "勞動法規", DifficultyLevel.BEGINNER, [question])
+        agent.active_sessions = OrderedDict(s_1=session)
+        agent._session_locks = defaultdict(asyncio.Lock)
+        agent._assess_answer = AsyncMock(return_value=(True, None))
+        feedback_started = asyncio.Event()
+        
+        async def generate_feedback(*args):
+            feedback_started.set()
+            await asyncio.sleep(3600)
+        
+        agent._generate_feedback = generate_feedback
+        agent.get_user_progress = AsyncMock(side_effect=RuntimeError("資料庫無法連線"))
+        
+        with pytest.raises(RuntimeError):
+            await agent.submit_answer("s_1", "1.34倍", 5.0)
+        
+        pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        await asyncio.sleep(0)
+        assert all(task.done() for task in pending)
@@ -0,0 +1,46 @@
+"""
+Unit Tests for JSON Utilities
+JSON工具單元測試
+"""
+
+import json
+from enum import IntEnum
+
+import pytest
+
+from core.json_utils import dumps_json, loads_json
+
+
+class Level(IntEnum):
+    """測試用的整數列舉"""
+    HIGH = 3
+
+
+@pytest.mark.unit
+class TestJsonUtils:
+    """JSON工具測試類"""
+
+    @pytest.mark.parametrize("data", [
+        {"國家": "台灣", "薪資": 30000},
+        {"level": Level.HIGH, "ratio": 1.5},
+        [1, "二", None, True],
+    ])
+    def test_dumps_json_matches_stdlib(self, data):
+        """測試序列化結果可被標準庫還原，且與原資料一致"""
+        assert json.loads(dumps_json(data)) == json.loads(json.dumps(data, ensure_ascii=False))
+
+    def test_dumps_json_keeps_chinese(self):
+        """測試中文字元不被跳脫"""
+        assert "台灣" in dumps_json({"country": "台灣"})
+
+    def test_loads_json_round_trip(self):
+        """測試解析後與原資料相同"""
+        data = {"規定": ["加班", "特休"], "天數": 7}
+        assert loads_json(dumps_json(data)) == data
+
+    def test_dumps_json_compact_is_single_line(self):
+        """測試 indent=False 時輸出單行，可直接放入 SSE 的 data 欄位"""
+        output = dumps_json({"問題": "加班費\n如何計算", "選項": [1, 2]}, indent=False)
+        
+        assert "\n" not in output
+        assert json.loads(output) == {"問題": "加班費\n如何計算", "選項": [1, 2]}
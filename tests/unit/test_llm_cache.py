@@ -0,0 +1,151 @@
+"""
+Unit Tests for Semantic LLM Cache
+語意回應快取單元測試
+"""
+
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from agents.llm_cache import SemanticLLMCache, _quantize, derive_partition
+
+
+class FakeEmbeddings:
+    """依預設對照表返回固定向量的嵌入模型"""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    async def aembed_query(self, text):
+        return self.vectors[text]
+
+
+@pytest.mark.unit
+@pytest.mark.agent
+class TestSemanticLLMCache:
+    """語意回應快取測試類"""
+
+    @pytest.fixture
+    def embeddings(self):
+        """創建測試用的嵌入模型"""
+        return FakeEmbeddings({
+            "勞基法加班規定": [1.0, 0.0, 0.0],
+            "加班勞基規定": [0.98, 0.05, 0.0],
+            "特休假天數": [0.0, 1.0, 0.0],
+            "育嬰留停": [0.0, 0.0, 1.0],
+        })
+
+    @pytest.mark.asyncio
+    async def test_similar_task_reuses_response(self, embeddings):
+        """測試語意相近的任務命中快取，不再呼叫LLM"""
+        cache = SemanticLLMCache(embeddings)
+        predict = AsyncMock(return_value="加班費依勞基法第24條計算")
+
+        first = await cache.get_or_predict("勞基法加班規定", predict)
+        second = await cache.get_or_predict("加班勞基規定", predict)
+
+        assert first == second == "加班費依勞基法第24條計算"
+        predict.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_dissimilar_task_calls_llm(self, embeddings):
+        """測試語意不同的任務不會命中快取"""
+        cache = SemanticLLMCache(embeddings)
+
+        await cache.get_or_predict("勞基法加班規定", AsyncMock(return_value="加班"))
+        result = await cache.get_or_predict("特休假天數", AsyncMock(return_value="特休"))
+
+        assert result == "特休"
+
+    @pytest.mark.asyncio
+    async def test_oldest_entry_evicted_when_full(self, embeddings):
+        """測試快取已滿時覆寫最舊的項目"""
+        cache = SemanticLLMCache(embeddings, max_entries=2)
+
+        await cache.get_or_predict("勞基法加班規定", AsyncMock(return_value="加班"))
+        await cache.get_or_predict("特休假天數", AsyncMock(return_value="特休"))
+        await cache.get_or_predict("育嬰留停", AsyncMock(return_value="育嬰"))
+
+        predict = AsyncMock(return_value="重新生成")
+        assert await cache.get_or_predict("勞基法加班規定", predict) == "重新生成"
+        assert await cache.get_or_predict("育嬰留停", predict) == "育嬰"
+
+    def test_quantized_vector_preserves_similarity(self):
+        """測試 int8 量化後的內積與原始浮點內積誤差極小"""
+        rng = np.random.default_rng(0)
+        a = rng.standard_normal(1536).astype(np.float32)
+        b = a + 0.3 * rng.standard_normal(1536).astype(np.float32)
+        a /= np.linalg.norm(a)
+        b /= np.linalg.norm(b)
+
+        qa, sa = _quantize(a)
+        qb, sb = _quantize(b)
+        approx = float(qa.astype(np.int32) @ qb.astype(np.int32)) * sa * sb
+
+        assert approx == pytest.approx(float(a @ b), abs=0.01)
+
+    @pytest.mark.asyncio
+    async def test_different_country_does_not_share_response(self):
+        """測試語意相近但詢問不同國家的問題不會共用快取回答"""
+        cache = SemanticLLMCache(FakeEmbeddings({
+            "台灣加班費怎麼算": [1.0, 0.0, 0.0],
+            "日本加班費怎麼算": [1.0, 0.0, 0.0],
+        }))
+
+        await cache.get_or_predict("台灣加班費怎麼算", AsyncMock(return_value="依勞基法第24條"))
+        result = await cache.get_or_predict("日本加班費怎麼算", AsyncMock(return_value="依労働基準法第37条"))
+
+        assert result == "依労働基準法第37条"
+
+    @pytest.mark.asyncio
+    async def test_explicit_partition_overrides_derived(self, embeddings):
+        """測試呼叫端指定分區時只與同分區項目比對"""
+        cache = SemanticLLMCache(embeddings)
+
+        await cache.get_or_predict("勞基法加班規定", AsyncMock(return_value="台灣"), partition="TW")
+        result = await cache.get_or_predict("勞基法加班規定", AsyncMock(return_value="日本"), partition="JP")
+
+        assert result == "日本"
+
+    @pytest.mark.parametrize("text,expected", [
+        ("台灣加班費", "TW|"),
+        ("臺灣與Japan的特休差異", "JP,TW|"),
+        ("勞基法第 24 條加班費", "|24"),
+        ("usage of overtime", "|"),
+    ])
+    def test_derive_partition(self, text, expected):
+        """測試由國家與條文編號推導分區鍵"""
+        assert derive_partition(text) == expected
+
+    @pytest.mark.asyncio
+    async def test_expired_entry_calls_llm(self, embeddings):
+        """測試超過 TTL 的項目不再命中"""
+        cache = SemanticLLMCache(embeddings, ttl=60)
+
+        with patch("agents.llm_cache.time.monotonic", return_value=1000.0):
+            await cache.get_or_predict("勞基法加班規定", AsyncMock(return_value="舊回答"))
+        with patch("agents.llm_cache.time.monotonic", return_value=1030.0):
+            assert await cache.get_or_predict("勞基法加班規定", AsyncMock(return_value="新回答")) == "舊回答"
+        with patch("agents.llm_cache.time.monotonic", return_value=1061.0):
+            assert await cache.get_or_predict("勞基法加班規定", AsyncMock(return_value="新回答")) == "新回答"
+
+    @pytest.mark.asyncio
+    async def test_invalidate_partition(self, embeddings):
+        """測試使分區失效後重新呼叫LLM"""
+        cache = SemanticLLMCache(embeddings)
+        await cache.get_or_predict("勞基法加班規定", AsyncMock(return_value="舊回答"))
+
+        cache.invalidate(derive_partition("勞基法加班規定"))
+        result = await cache.get_or_predict("勞基法加班規定", AsyncMock(return_value="新回答"))
+
+        assert result == "新回答"
+
+    @pytest.mark.asyncio
+    async def test_threshold_is_configurable(self, embeddings):
+        """測試較嚴格的門檻會拒絕相似度不足的項目"""
+        cache = SemanticLLMCache(embeddings, threshold=0.999)
+
+        await cache.get_or_predict("勞基法加班規定", AsyncMock(return_value="加班"))
+        result = await cache.get_or_predict("加班勞基規定", AsyncMock(return_value="重新生成"))
+
+        assert result == "重新生成"
@@ -3,11 +3,18 @@ Unit Tests for Master Orchestrator
 Master Orchestrator 單元測試
 """
 
+import asyncio
+import copy
+import pickle
+from collections import OrderedDict
+
 import pytest
 from unittest.mock import Mock, AsyncMock, patch
 from datetime import datetime
 
-from agents.master_orchestrator import MasterOrchestrator, AnalysisContext, IntegratedStrategy
+from agents.master_orchestrator import (
+    MasterOrchestrator, AnalysisContext, IntegratedStrategy, AgentInsight, StrategicDecisionEngine, Priority
+)
 
 
 @pytest.mark.unit
@@ -258,4 +265,127 @@ class TestMasterOrchestrator:
                 
                 mock_get_cache.assert_called_once()
                 # 應該返回緩存的結果（轉換為IntegratedStrategy）
-                assert result is not None
\ No newline at end of file
+                assert result is not None
+
+    @pytest.mark.asyncio
+    async def test_cached_strategy_is_isolated_between_callers(self):
+        """測試緩存與共用的分析結果各呼叫端取得獨立副本，修改不影響其他呼叫端"""
+        # 只測試緩存邏輯，不建立智能體與LLM客戶端
+        with patch.object(MasterOrchestrator, '__abstractmethods__', frozenset()):
+            orchestrator = MasterOrchestrator.__new__(MasterOrchestrator)
+        orchestrator._result_cache = OrderedDict()
+        orchestrator._pending_analyses = {}
+        strategy = IntegratedStrategy(
+            individual_recommendations=[{'id': 'r1'}],
+            team_recommendations=[],
+            organizational_recommendations=[],
+            priority_score=0.5,
+            implementation_timeline={'immediate': ['task']},
+            success_metrics=[],
+            risk_mitigation=[]
+        )
+        
+        async def analyze(context, context_key):
+            orchestrator._cache_result(context_key, strategy)
+            return strategy
+        
+        orchestrator._analyze_comprehensive = analyze
+        context = AnalysisContext(
+            employee_data={'count': 10},
+            organizational_data={},
+            priority_goals=['retention'],
+            time_horizon='short_term',
+            urgency_level=Priority.HIGH,
+            business_context={}
+        )
+        
+        first, second = await asyncio.gather(
+            orchestrator.analyze_comprehensive(context),
+            orchestrator.analyze_comprehensive(context)
+        )
+        first.individual_recommendations.append({'id': 'mutated'})
+        third = await orchestrator.analyze_comprehensive(context)
+        
+        assert second.individual_recommendations == [{'id': 'r1'}]
+        assert third.individual_recommendations == [{'id': 'r1'}]
+
+
+@pytest.mark.unit
+@pytest.mark.agent
+class TestStrategicDecisionEngine:
+    """戰略決策引擎測試類"""
+    
+    def _insight(self, name, confidence, opportunities):
+        return AgentInsight(
+            agent_name=name,
+            recommendations=[],
+            confidence_score=confidence,
+            risk_factors=[],
+            opportunities=opportunities,
+            data_quality_score=0.8,
+            processing_time=0.0
+        )
+    
+    def test_integrate_opportunities_ranks_by_mean_confidence(self):
+        """測試機會依各智能體平均信心度排序"""
+        engine = StrategicDecisionEngine()
+        insights = {
+            'brain': self._insight('brain', 0.9, ['mentoring', 'upskilling']),
+            'talent': self._insight('talent', 0.5, ['mentoring', 'referral']),
+            'culture': self._insight('culture', 0.8, ['upskilling'])
+        }
+        
+        opportunities = engine._integrate_opportunities(insights)
+        
+        # upskilling 0.85 > mentoring 0.7 > referral 0.5
+        assert opportunities == ['upskilling', 'mentoring', 'referral']
+    
+    @pytest.mark.parametrize("value", [
+        AgentInsight(
+            agent_name='brain',
+            recommendations=[{'id': 'r1', 'scope': 'team'}],
+            confidence_score=0.9,
+            risk_factors=['Critical turnover'],
+            opportunities=['mentoring'],
+            data_quality_score=0.8,
+            processing_time=0.1
+        ),
+        AnalysisContext(
+            employee_data={'count': 10},
+            organizational_data={},
+            priority_goals=['retention'],
+            time_horizon='short_term',
+            urgency_level=Priority.HIGH,
+            business_context={}
+        ),
+        IntegratedStrategy(
+            individual_recommendations=[],
+            team_recommendations=[],
+            organizational_recommendations=[],
+            priority_score=0.5,
+            implementation_timeline={'immediate': ['task']},
+            success_metrics=[],
+            risk_mitigation=[]
+        ),
+    ])
+    def test_dataclasses_survive_pickle_and_deepcopy(self, value):
+        """測試分析資料結構可序列化與深拷貝，供快取儲存使用"""
+        assert pickle.loads(pickle.dumps(value)) == value
+        assert copy.deepcopy(value) == value
+    
+    def test_pickled_insight_keeps_lowercased_risks(self):
+        """測試還原後的洞察保留小寫風險"""
+        insight = AgentInsight(
+            agent_name='talent',
+            recommendations=[],
+            confidence_score=0.9,
+            risk_factors=['Severe Attrition'],
+            opportunities=[],
+            data_quality_score=0.8,
+            processing_time=0.0
+        )
+        
+        restored = pickle.loads(pickle.dumps(insight))
+        
+        assert restored.risk_factors_lower == ('severe attrition',)
+